@@ -1,6 +1,7 @@
 """
 Package with utilities required to render figures
 """
+
 from functools import partial
 from itertools import islice
 
@@ -11,7 +12,10 @@ from crystals.affine import change_of_basis
 from mpl_toolkits.axes_grid1 import ImageGrid
 from skued import spectrum_colors
 
+from .maps import load_maps, save_maps
+from .regrid import Regridder
 from .snse import DatasetInfo, DatasetInfo200
+from .timeseries import time_series_selections
 
 # CONSTANTS -------------------------------------------------------------------
 
@@ -0,0 +1,93 @@
+"""
+Storage of large 2D maps, e.g. one-phonon structure factors on the detector,
+in a single HDF5 file with precomputed downsampled levels.
+"""
+
+import os
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+DEFAULT_LEVELS = (1, 2, 4, 8)
+
+
+def save_maps(fname, maps, extras=None, levels=DEFAULT_LEVELS):
+    """
+    Save 2D maps in a single HDF5 file, in single precision, chunked and compressed.
+
+    Every map is stored at every downsampling level in `levels`, in the group
+    named after the level. Downsampling is done by striding, i.e. level ``n``
+    holds ``arr[::n, ::n]``.
+
+    Parameters
+    ----------
+    fname : path-like
+        HDF5 file. It is replaced if it exists.
+    maps : dict[str, ndarray]
+        2D maps, e.g. ``{"qx": qx, "LA_oneph": image}``.
+    extras : dict[str, ndarray], optional
+        Other arrays, stored as-is at the root of the file.
+    levels : iterable of int, optional
+        Downsampling levels to precompute. Level 1 is always stored.
+    """
+    fname = Path(fname)
+    extras = extras or dict()
+    levels = sorted(set(levels) | {1})
+
+    # The file is written in a temporary location first, so that
+    # readers never see a partially-written file.
+    tmpname = fname.with_name(f".tmp-{fname.name}")
+    with h5py.File(tmpname, mode="w") as f:
+        f.attrs["levels"] = levels
+        for name, arr in extras.items():
+            f.create_dataset(name, data=arr)
+
+        for level in levels:
+            group = f.create_group(str(level))
+            for name, arr in maps.items():
+                group.create_dataset(
+                    name,
+                    data=np.asarray(arr[::level, ::level], dtype=np.float32),
+                    chunks=True,
+                    compression="gzip",
+                    shuffle=True,
+                )
+    os.replace(tmpname, fname)
+
+
+def load_maps(fname, *names, downsampling=1):
+    """
+    Load 2D maps saved with `save_maps`, at a specific downsampling.
+
+    Only the necessary data is read from disk: the coarsest precomputed level
+    compatible with `downsampling` is used, and strided further if needed.
+    Names which are not maps, e.g. extras of `save_maps`, are read whole.
+
+    Parameters
+    ----------
+    fname : path-like
+        HDF5 file.
+    names : str
+        Names of the maps, e.g. "qx", "LA_oneph".
+    downsampling : int, optional
+        Downsampling factor, i.e. ``arr[::downsampling, ::downsampling]``.
+
+    Returns
+    -------
+    maps : ndarray or tuple of ndarrays
+        One array for each name.
+    """
+    with h5py.File(fname, mode="r") as f:
+        level = max(lvl for lvl in f.attrs["levels"] if downsampling % lvl == 0)
+        group = f[str(level)]
+        step = downsampling // level
+
+        arrays = tuple(
+            group[name][::step, ::step] if name in group else f[name][()]
+            for name in names
+        )
+
+    if len(arrays) == 1:
+        return arrays[0]
+    return arrays
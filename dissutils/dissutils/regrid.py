@@ -0,0 +1,101 @@
+"""
+Interpolation of scattered data, where the geometry is computed only once
+"""
+import numpy as np
+from scipy.spatial import Delaunay, cKDTree
+
+
+class Regridder:
+    """
+    Interpolate values defined on scattered points onto fixed points `xi`.
+    This is equivalent to ``scipy.interpolate.griddata``, except that the spatial
+    index (``method="nearest"``) or the triangulation and barycentric weights
+    (``method="linear"``) are calculated once, and re-used for any number of
+    value arrays.
+
+    Parameters
+    ----------
+    points : ndarray, shape (N, D)
+        Points at which values are defined.
+    xi : ndarray of shape (..., D), or tuple of D ndarrays
+        Points at which to interpolate data, e.g. a tuple of meshgrid arrays.
+    method : {"nearest", "linear"}, optional
+        Method of interpolation. See ``scipy.interpolate.griddata``.
+    fill_value : float, optional
+        Value used for points outside of the convex hull of `points`.
+        This has no effect if ``method = "nearest"``.
+    """
+
+    def __init__(self, points, xi, method="nearest", fill_value=np.nan):
+        points = np.asarray(points, dtype=float)
+        if isinstance(xi, tuple):
+            xi = np.stack(np.broadcast_arrays(*xi), axis=-1)
+        xi = np.asarray(xi, dtype=float)
+
+        self.npoints, ndim = points.shape
+        self.shape = xi.shape[:-1]
+        self.method = method
+        self.fill_value = fill_value
+
+        xi = xi.reshape((-1, ndim))
+        if method == "nearest":
+            _, self.indices = cKDTree(points).query(xi)
+            self.indices = self.indices[:, None]
+            self.weights = None
+            self.outside = None
+        elif method == "linear":
+            tri = Delaunay(points)
+            simplices = tri.find_simplex(xi)
+            self.outside = simplices < 0
+
+            transform = tri.transform[simplices]
+            bary = np.einsum(
+                "nij,nj->ni", transform[:, :ndim, :], xi - transform[:, ndim, :]
+            )
+            self.indices = tri.simplices[simplices]
+            self.weights = np.hstack([bary, 1 - bary.sum(axis=1, keepdims=True)])
+            self.weights[self.outside] = 0
+        else:
+            raise ValueError(f"Unknown interpolation method {method}")
+
+    def __call__(self, *values):
+        """
+        Interpolate values onto `xi`.
+
+        Parameters
+        ----------
+        values : ndarrays, shape (N, ...)
+            Values defined at every one of the N points. All arrays are
+            interpolated together in a single pass.
+
+        Returns
+        -------
+        interpolated : ndarray or tuple of ndarrays, shapes xi.shape[:-1] + (...)
+            One interpolated array for each array in `values`.
+        """
+        values = [np.asarray(v) for v in values]
+        for v in values:
+            if v.shape[0] != self.npoints:
+                raise ValueError(
+                    f"Expected values of length {self.npoints}, got {v.shape[0]}"
+                )
+
+        # All arrays are stacked column-wise so that interpolation
+        # is done in a single vectorized pass
+        columns = [v.reshape((self.npoints, -1)) for v in values]
+        stacked = np.hstack(columns)
+
+        if self.method == "nearest":
+            interpolated = stacked[self.indices[:, 0]]
+        else:
+            interpolated = np.einsum("nv,nvc->nc", self.weights, stacked[self.indices])
+            interpolated[self.outside] = self.fill_value
+
+        splits = np.cumsum([c.shape[1] for c in columns])[:-1]
+        results = tuple(
+            arr.reshape(self.shape + v.shape[1:])
+            for arr, v in zip(np.split(interpolated, splits, axis=1), values)
+        )
+        if len(results) == 1:
+            return results[0]
+        return results
@@ -1,6 +1,7 @@
 """
 Important constants for datasets
 """
+
 from math import sqrt
 from pathlib import Path
 
@@ -75,6 +76,18 @@ def photocarrier_density(fluence, thickness=SAMPLE_THICKNESS):
     return total_carriers / (SAMPLE_VOLUME * m3_to_cm3)  # 1/cm^3
 
 
+def _summed_area_table(arr):
+    """Summed-area table of a 2D array, padded with zeros in the first row and column."""
+    table = np.zeros(shape=(arr.shape[0] + 1, arr.shape[1] + 1), dtype=float)
+    np.cumsum(np.cumsum(arr, axis=0), axis=1, out=table[1:, 1:])
+    return table
+
+
+def _window_sums(table, r0, r1, c0, c1):
+    """Sums of ``arr[r0:r1, c0:c1]`` from the summed-area table of ``arr``."""
+    return table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]
+
+
 class DatasetInfo:
     """
     This class aggregates information specific to each dataset,
@@ -97,23 +110,152 @@ class DatasetInfo:
         """Determine the array indices for Miller indices (h, k, l)."""
         return (k * self.bstar + l * self.cstar + np.array(self.center)).astype(int)
 
-    def kgrid(self):
-        """Calculate the kx, ky meshgrid of the dataset."""
+    def millers_to_arrindices(self, h, k, l, subpixel=False):
+        """
+        Determine the array indices for many, possibly fractional, Miller indices at once.
+        This is the vectorized version of `DatasetInfo.miller_to_arrindex`.
+
+        Parameters
+        ----------
+        h, k, l : array-like
+            Miller indices. Arrays are broadcast together.
+        subpixel : bool, optional
+            If True, fractional pixel coordinates are returned. Otherwise,
+            coordinates are truncated to integers like `DatasetInfo.miller_to_arrindex`.
+
+        Returns
+        -------
+        yi, xi : ndarray
+            Array indices, of the broadcast shape of `h`, `k`, and `l`.
+        """
+        h, k, l = np.broadcast_arrays(h, k, l)
+        indices = (
+            k[..., None] * self.bstar
+            + l[..., None] * self.cstar
+            + np.array(self.center)
+        )
+        if not subpixel:
+            indices = indices.astype(int)
+        return np.moveaxis(indices, -1, 0)
+
+    def brillouin_zone_maps(
+        self, image, reflections, extent, half_width=15, offset=(0, 0)
+    ):
+        """
+        Sample the Brillouin zones of many reflections, averaging square windows
+        of `image` centered on every point of the zones.
+
+        All window means and standard deviations are computed at once using
+        summed-area tables. Windows which contain non-finite values are NaN.
+
+        Parameters
+        ----------
+        image : ndarray, shape (N, M)
+            Diffraction image, e.g. a relative intensity change.
+        reflections : iterable of 3-tuples
+            Miller indices (h, k, l) of the zone centers.
+        extent : ndarray, shape (P,)
+            Fractional offsets along k and l from the zone center, e.g.
+            ``np.linspace(-1/2, 1/2, 64)``.
+        half_width : int, optional
+            Windows are of size ``2 * half_width`` square.
+        offset : 2-tuple of int, optional
+            Offset of the windows, in image rows and columns, to account for
+            reflections which are not perfectly aligned.
+
+        Returns
+        -------
+        bz : ndarray, shape (P, P)
+            Window means, averaged over reflections. Axis 0 is along k, axis 1 along l.
+        err : ndarray, shape (P, P)
+            Window standard deviations, added in quadrature and averaged over reflections.
+        """
+        reflections = np.asarray(list(reflections))
+        image = np.asarray(image, dtype=float)
+
+        # Values are shifted to reduce round-off error in the sum of squares
+        finite = np.isfinite(image)
+        shift = np.mean(image[finite]) if np.any(finite) else 0
+        values = np.where(finite, image - shift, 0)
+        sums = _summed_area_table(values)
+        squares = _summed_area_table(values**2)
+        invalid = _summed_area_table(~finite)
+
+        # Array indices for all reflections and zone points: shape (nrefl, P, P)
+        ys, zs = np.meshgrid(extent, extent, indexing="ij")
+        h, k, l = (reflections[:, i, None, None] for i in range(3))
+        yis, xis = self.millers_to_arrindices(h, k + ys, l + zs)
+
+        rowoffset, coloffset = offset
+        r0 = np.clip(xis - half_width + rowoffset, 0, image.shape[0])
+        r1 = np.clip(xis + half_width + rowoffset, 0, image.shape[0])
+        c0 = np.clip(yis - half_width + coloffset, 0, image.shape[1])
+        c1 = np.clip(yis + half_width + coloffset, 0, image.shape[1])
+
+        count = (r1 - r0) * (c1 - c0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = _window_sums(sums, r0, r1, c0, c1) / count
+            var = _window_sums(squares, r0, r1, c0, c1) / count - mean**2
+        std = np.sqrt(np.maximum(var, 0))
+
+        empty = (count == 0) | (_window_sums(invalid, r0, r1, c0, c1) > 0)
+        mean[empty] = np.nan
+        std[empty] = np.nan
+
+        nrefl = len(reflections)
+        bz = np.sum(mean + shift, axis=0) / nrefl
+        err = np.sqrt(np.sum(std**2, axis=0)) / nrefl
+        return bz, err
+
+    def kgrid_axes(self):
+        """
+        Calculate the kx and ky axes of the dataset, i.e. the first row of kx
+        and the first column of ky from `DatasetInfo.kgrid`. Results are cached.
+
+        Returns
+        -------
+        extent_kx, extent_ky : ndarray, shape (2048,)
+            Scattering vector components [1/A].
+        """
+        if getattr(self, "_kgrid_axes", None) is not None:
+            return self._kgrid_axes
+
         wavelength = skued.electron_wavelength(keV=90)
         # Grid of detector dimention in meters
         pixel_width = 14e-6  # Pixel width of a Gatan Ultrascan 895
         cx, cy = self.center
-        extent_x = np.arange(0, 2048) - cx
-        extent_y = np.arange(0, 2048) - cy
-        xx, yy = np.meshgrid(pixel_width * extent_x, pixel_width * extent_y)
+        extent_x = pixel_width * (np.arange(0, 2048) - cx)
+        extent_y = pixel_width * (np.arange(0, 2048) - cy)
+
+        def scattering_vector(xx, yy):
+            r, phi = np.sqrt(xx**2 + yy**2), np.arctan2(yy, xx)
+            angle = np.arctan(r / CAMERA_LENGTH)
+
+            # Scattering vector norm (inverse Angs)
+            nG = 4 * np.pi * np.sin(angle / 2) / wavelength
+            return nG * np.cos(phi), nG * np.sin(phi)
 
-        r, phi = np.sqrt(xx**2 + yy**2), np.arctan2(yy, xx)
-        angle = np.arctan(r / CAMERA_LENGTH)
+        # Only the first row and column of the detector are required
+        extent_kx, _ = scattering_vector(extent_x, extent_y[0])
+        _, extent_ky = scattering_vector(extent_x[0], extent_y)
 
-        # Scattering vector norm (inverse Angs)
-        nG = 4 * np.pi * np.sin(angle / 2) / wavelength
-        extent_kx, extent_ky = (nG * np.cos(phi))[0, :], (nG * np.sin(phi))[:, 0]
-        return np.meshgrid(extent_kx, extent_ky)
+        self._kgrid_axes = (extent_kx, extent_ky)
+        return self._kgrid_axes
+
+    @property
+    def dk(self):
+        """Pixel spacing along kx [1/A]."""
+        extent_kx, _ = self.kgrid_axes()
+        return extent_kx[1] - extent_kx[0]
+
+    def kgrid(self):
+        """
+        Calculate the kx, ky meshgrid of the dataset.
+        The meshgrid arrays are read-only views of `DatasetInfo.kgrid_axes`.
+        """
+        kx, ky = np.meshgrid(*self.kgrid_axes(), copy=False)
+        kx.flags.writeable, ky.flags.writeable = False, False
+        return kx, ky
 
 
 class DatasetInfo200(DatasetInfo):
@@ -0,0 +1,65 @@
+"""
+Extraction of many time-series from a diffraction dataset, in a single pass
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+def time_series_selections(dset, selections, chunksize=64):
+    """
+    Integrated intensity time-series for many selections at once.
+
+    The result for every selection is the same as
+    ``DiffractionDataset.time_series_selection``, i.e. the mean intensity
+    over the pixels of the selection. However, the intensity data is read from disk only once, in chunks of rows,
+    rather than once per selection.
+
+    Parameters
+    ----------
+    dset : iris.DiffractionDataset
+        Dataset from which to extract time-series.
+    selections : dict[hashable, skued.Selection or ndarray]
+        Named selections. Arrays are interpreted as boolean masks.
+    chunksize : int, optional
+        Number of rows of intensity data read at once.
+
+    Returns
+    -------
+    timeseries : dict[hashable, ndarray], shapes (ntimes,)
+        Time-series for every selection.
+    """
+    names = list(selections)
+
+    # Sparse weights from every pixel to every selection. Only the rows
+    # and columns spanned by the union of selections are ever read.
+    rows, cols, weights, targets = [], [], [], []
+    for index, name in enumerate(names):
+        r, c = np.nonzero(np.asarray(selections[name], dtype=bool))
+        rows.append(r)
+        cols.append(c)
+        weights.append(np.full(len(r), 1 / max(1, len(r))))
+        targets.append(np.full(len(r), index))
+
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    weights, targets = np.concatenate(weights), np.concatenate(targets)
+    if len(rows) == 0:
+        return {name: np.zeros(len(dset.time_points)) for name in names}
+
+    rmin, rmax = rows.min(), rows.max() + 1
+    cmin, cmax = cols.min(), cols.max() + 1
+    width = cmax - cmin
+    matrix = csr_matrix(
+        (weights, ((rows - rmin) * width + (cols - cmin), targets)),
+        shape=((rmax - rmin) * width, len(names)),
+    )
+
+    intensity = dset.diffraction_group["intensity"]
+    timeseries = np.zeros(shape=(len(names), intensity.shape[2]), dtype=float)
+    for start in range(rmin, rmax, chunksize):
+        stop = min(start + chunksize, rmax)
+        block = np.asarray(intensity[start:stop, cmin:cmax, :], dtype=float)
+        chunk = matrix[(start - rmin) * width : (stop - rmin) * width]
+        timeseries += chunk.T @ block.reshape((-1, block.shape[-1]))
+
+    return dict(zip(names, timeseries))
@@ -6,13 +6,12 @@ import h5py
 import matplotlib.patches as mpatches
 import matplotlib.pyplot as plt
 import numpy as np
-import scipy.interpolate as interpolate
 from crystals import Crystal
 from crystals.affine import change_of_basis
 from matplotlib.ticker import FixedFormatter, FixedLocator
 from skued import nfold
 
-from dissutils import LARGE_FIGURE_WIDTH, ImageGrid, draw_hexagon
+from dissutils import LARGE_FIGURE_WIDTH, ImageGrid, Regridder, draw_hexagon
 
 GAMMA_RADIUS = 0.45  # inverse angstroms
 INPUT = Path("data") / "graphite" / "populations"
@@ -86,14 +85,16 @@ with h5py.File(INPUT / "population_timeseries.hdf5", mode="r") as f:
     kx, ky = np.meshgrid(np.linspace(-kmax, kmax, 256), np.linspace(-kmax, kmax, 256))
     kk = np.sqrt(kx**2 + ky**2)
 
+    # All modes are defined on the same k-points; the triangulation
+    # is therefore only computed once.
+    regridder = Regridder(
+        points=np.hstack((kx_, ky_)),
+        xi=(kx, ky),
+        method="linear",  # fill_value has no effect if method = 'nearest'
+        fill_value=0.0,
+    )
     for mode_name in MODES:
-        image = interpolate.griddata(
-            points=np.hstack((kx_, ky_)),
-            values=np.array(f[mode_name]),
-            xi=(kx, ky),
-            method="linear",  # fill_value has no effect if method = 'nearest'
-            fill_value=0.0,
-        )
+        image = regridder(np.array(f[mode_name]))
         image = nfold(image, 6)
         image[kk < 0.45] = 0
         populations[mode_name] = image
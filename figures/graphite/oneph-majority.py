@@ -11,6 +11,7 @@ from dissutils import (
     ImageGrid,
     discrete_colors,
     draw_hexagon_field,
+    load_maps,
     tag_axis,
 )
 
@@ -37,10 +38,12 @@ DOWNSAMPLING = 4
 
 def oneph_weighted(mode):
     """|F_{1\lambda}|^2 / \omega_{j, k}"""
-    F1j = np.load(INPUT / "oneph" / f"{mode}_oneph.npy")[::DOWNSAMPLING, ::DOWNSAMPLING]
-    omega = np.load(INPUT / "oneph" / f"{mode}_freq.npy")[
-        ::DOWNSAMPLING, ::DOWNSAMPLING
-    ]
+    F1j, omega = load_maps(
+        INPUT / "oneph" / "oneph.hdf5",
+        f"{mode}_oneph",
+        f"{mode}_freq",
+        downsampling=DOWNSAMPLING,
+    )
     return F1j / omega
 
 
@@ -140,8 +143,9 @@ assert len(cmaplist) >= len(labels)
 cmap = cm.ListedColormap(name="Modes", colors=cmaplist)
 norm = cm.BoundaryNorm(bounds, cmap.N)
 
-qx = np.load(INPUT / "oneph" / "qx.npy")[::DOWNSAMPLING, ::DOWNSAMPLING]
-qy = np.load(INPUT / "oneph" / "qy.npy")[::DOWNSAMPLING, ::DOWNSAMPLING]
+qx, qy = load_maps(
+    INPUT / "oneph" / "oneph.hdf5", "qx", "qy", downsampling=DOWNSAMPLING
+)
 m = ax.imshow(
     majority, cmap=cmap, norm=norm, extent=[qx.min(), qx.max(), qy.min(), qy.max()]
 )
@@ -1,11 +1,16 @@
 from pathlib import Path
 
 import matplotlib.pyplot as plt
-import numpy as np
 from crystals import Crystal
 from matplotlib.ticker import FixedFormatter, FixedLocator
 
-from dissutils import LARGE_FIGURE_WIDTH, ImageGrid, draw_hexagon_field, tag_axis
+from dissutils import (
+    LARGE_FIGURE_WIDTH,
+    ImageGrid,
+    draw_hexagon_field,
+    load_maps,
+    tag_axis,
+)
 
 INPUT = Path("data") / "graphite"
 DOWNSAMPLING = 4
@@ -43,17 +48,17 @@ grid = ImageGrid(
     cbar_location="top",
 )
 
-qx = np.load(INPUT / "oneph" / "qx.npy")[::DOWNSAMPLING, ::DOWNSAMPLING]
-qy = np.load(INPUT / "oneph" / "qy.npy")[::DOWNSAMPLING, ::DOWNSAMPLING]
-bragg_peaks = np.load(INPUT / "oneph" / "bragg_peaks.npy")
+qx, qy, bragg_peaks = load_maps(
+    INPUT / "oneph" / "oneph.hdf5", "qx", "qy", "bragg_peaks", downsampling=DOWNSAMPLING
+)
 cryst = Crystal.from_pwscf(INPUT / "graphite.out")
 
 # Only Longitudinal modes here
 modes = filter(lambda s: s.startswith("T"), IN_PLANE_MODES)
 for mode, ax in zip(modes, grid):
-    image = np.load(INPUT / "oneph" / f"{mode}_oneph.npy")[
-        ::DOWNSAMPLING, ::DOWNSAMPLING
-    ]
+    image = load_maps(
+        INPUT / "oneph" / "oneph.hdf5", f"{mode}_oneph", downsampling=DOWNSAMPLING
+    )
 
     # Image is scaled so maximum is always 1
     m = ax.imshow(
@@ -1,11 +1,10 @@
 from pathlib import Path
 
 import matplotlib.pyplot as plt
-import numpy as np
 from crystals import Crystal
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
-from dissutils import CBAR_SIZE, MEDIUM_FIGURE_WIDTH, draw_hexagon_field
+from dissutils import CBAR_SIZE, MEDIUM_FIGURE_WIDTH, draw_hexagon_field, load_maps
 
 INPUT = Path("data") / "graphite"
 DOWNSAMPLING = 4
@@ -20,11 +19,15 @@ figure, ax = plt.subplots(1, 1, figsize=(MEDIUM_FIGURE_WIDTH, 4))
 divider = make_axes_locatable(ax)
 cbar_ax = divider.append_axes("top", size=CBAR_SIZE, pad=0.05)
 
-qx = np.load(INPUT / "oneph" / "qx.npy")[::DOWNSAMPLING, ::DOWNSAMPLING]
-qy = np.load(INPUT / "oneph" / "qy.npy")[::DOWNSAMPLING, ::DOWNSAMPLING]
-bragg_peaks = np.load(INPUT / "oneph" / "bragg_peaks.npy")
+qx, qy, bragg_peaks, image = load_maps(
+    INPUT / "oneph" / "oneph.hdf5",
+    "qx",
+    "qy",
+    "bragg_peaks",
+    "LA_oneph",
+    downsampling=DOWNSAMPLING,
+)
 cryst = Crystal.from_pwscf(INPUT / "graphite.out")
-image = np.load(INPUT / "oneph" / f"LA_oneph.npy")[::DOWNSAMPLING, ::DOWNSAMPLING]
 
 # Image is scaled so maximum is always 1
 m = ax.imshow(
@@ -7,7 +7,12 @@ import skued
 from crystals import Crystal
 from iris import DiffractionDataset
 
-from dissutils import MEDIUM_FIGURE_WIDTH, discrete_colors, tag_axis
+from dissutils import (
+    MEDIUM_FIGURE_WIDTH,
+    discrete_colors,
+    tag_axis,
+    time_series_selections,
+)
 from dissutils.snse import overnight4
 
 CRYSTAL = Crystal.from_cif(Path("data") / "snse" / "snse_pnma.cif")
@@ -30,35 +35,30 @@ INDICES_DIFFUSE_B = [
     (0, -5, 1),
 ]
 
-timeseries = dict()
 with DiffractionDataset(overnight4.path, mode="r") as dset:
     timedelays = dset.time_points
 
-    timeseries["gamma-c"] = np.zeros_like(timedelays)
-    for indices in INDICES_DIFFUSE_C:
-        q2 = np.linalg.norm(CRYSTAL.scattering_vector(indices)) ** 2
-
+    # Time-series for all reflections are extracted in a single pass
+    selections = dict()
+    for indices in INDICES_DIFFUSE_C + INDICES_DIFFUSE_B:
         yi, xi = overnight4.miller_to_arrindex(*indices)
-        diffuse_selection = skued.RingSelection(
+        selections[indices] = skued.RingSelection(
             shape=dset.resolution,
             center=(xi, yi),
             inner_radius=INNER_RADIUS,
             outer_radius=OUTER_RADIUS,
         )
-        timeseries["gamma-c"] += dset.time_series_selection(diffuse_selection) / q2
+    extracted = time_series_selections(dset, selections)
 
-    timeseries["gamma-b"] = np.zeros_like(timedelays)
-    for indices in INDICES_DIFFUSE_B:
+timeseries = dict()
+for name, reflections in [
+    ("gamma-c", INDICES_DIFFUSE_C),
+    ("gamma-b", INDICES_DIFFUSE_B),
+]:
+    timeseries[name] = np.zeros_like(timedelays)
+    for indices in reflections:
         q2 = np.linalg.norm(CRYSTAL.scattering_vector(indices)) ** 2
-
-        yi, xi = overnight4.miller_to_arrindex(*indices)
-        diffuse_selection = skued.RingSelection(
-            shape=dset.resolution,
-            center=(xi, yi),
-            inner_radius=INNER_RADIUS,
-            outer_radius=OUTER_RADIUS,
-        )
-        timeseries["gamma-b"] += dset.time_series_selection(diffuse_selection) / q2
+        timeseries[name] += extracted[indices] / q2
 
 
 # Normalize all time-series to pre-time-zero
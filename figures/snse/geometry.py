@@ -79,8 +79,7 @@ cbar_ax.xaxis.tick_top()
 # Inset
 # -----------------------------------------------------------------------------
 width = int(1.4 * OUTER_RADIUS)
-kx, _ = static.kgrid()
-dk = kx[0, 1] - kx[0, 0]
+dk = static.dk
 
 # Show the shape of the selections use to contruct time-series
 yc, xc = static.center
@@ -150,8 +149,7 @@ mark_inset(
 
 yi_, xi_ = static.miller_to_arrindex(0, 0, 2)
 width = int(1.4 * OUTER_RADIUS)
-kx, _ = static.kgrid()
-dk = kx[0, 1] - kx[0, 0]
+dk = static.dk
 kc = dk * (yi_ - yc)
 
 k = kc + dk * (
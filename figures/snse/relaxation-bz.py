@@ -1,4 +1,3 @@
-import itertools as it
 from pathlib import Path
 
 import matplotlib.pyplot as plt
@@ -43,30 +42,13 @@ IMAGE -= eq
 IMAGE /= eq
 
 
-def diffuse_amplitude(h, k, l):
-
-    result = np.zeros(shape=(len(EXTENT), len(EXTENT)), dtype=float)
-
-    # Reflections are not perfectly aligned
-    xoffset = -5
-    yoffset = -5
-
-    for y, z in it.product(EXTENT, repeat=2):
-
-        yi, xi = overnight4.miller_to_arrindex(h, k + y, l + z)
-
-        result[np.argmin(np.abs(EXTENT - y)), np.argmin(np.abs(EXTENT - z))] = np.mean(
-            IMAGE[
-                xi - INNER_RADIUS + xoffset : xi + INNER_RADIUS + xoffset,
-                yi - INNER_RADIUS + yoffset : yi + INNER_RADIUS + yoffset,
-            ]
-        )
-
-    return result
-
-
-result = sum(diffuse_amplitude(h, k, l) for (h, k, l) in INDICES_DIFFUSE) / len(
-    INDICES_DIFFUSE
+# Reflections are not perfectly aligned, hence the offset
+result, _ = overnight4.brillouin_zone_maps(
+    IMAGE,
+    reflections=INDICES_DIFFUSE,
+    extent=EXTENT,
+    half_width=INNER_RADIUS,
+    offset=(-5, -5),
 )
 
 # The image shows a deeply negative value where the Debye-Waller has occured
@@ -12,7 +12,12 @@ from iris import DiffractionDataset
 from matplotlib.ticker import FixedFormatter, FixedLocator
 from skimage.filters import gaussian
 
-from dissutils import LARGE_FIGURE_WIDTH, discrete_colors, tag_axis
+from dissutils import (
+    LARGE_FIGURE_WIDTH,
+    discrete_colors,
+    tag_axis,
+    time_series_selections,
+)
 from dissutils.snse import overnight4, static
 
 CRYSTAL = Crystal.from_cif(Path("data") / "snse" / "snse_pnma.cif")
@@ -61,33 +66,37 @@ figure, axes = plt.subplots(
 axs_trace = axes[:, 0]
 axs_im = axes[:, 1]
 
-timeseries = dict()
 with DiffractionDataset(overnight4.path, mode="r") as dset:
     timedelays = dset.time_points
 
+    # Time-series for all radii and reflections are extracted in a single pass
+    selections = dict()
     for r in [10, 15, 20, 25]:
         inner_radius = r
         outer_radius = 2 * r
-        timeseries[r] = np.zeros_like(timedelays)
         for indices in INDICES_DIFFUSE:
-            q2 = np.linalg.norm(CRYSTAL.scattering_vector(indices)) ** 2
-
             yi, xi = overnight4.miller_to_arrindex(*indices)
-            diffuse_selection = skued.RingSelection(
+            selections[r, indices] = skued.RingSelection(
                 shape=dset.resolution,
                 center=(xi, yi),
                 inner_radius=inner_radius,
                 outer_radius=outer_radius,
             )
-            timeseries[r] += dset.time_series_selection(diffuse_selection) / q2
+    extracted = time_series_selections(dset, selections)
+
+timeseries = dict()
+for r in [10, 15, 20, 25]:
+    timeseries[r] = np.zeros_like(timedelays)
+    for indices in INDICES_DIFFUSE:
+        q2 = np.linalg.norm(CRYSTAL.scattering_vector(indices)) ** 2
+        timeseries[r] += extracted[r, indices] / q2
 
 # Normalize all time-series to pre-time-zero
 for k, ts in timeseries.items():
     timeseries[k] /= np.mean(ts[timedelays < 0])
 
 
-kx, _ = overnight4.kgrid()
-dk = kx[0, 1] - kx[0, 0]
+dk = overnight4.dk
 
 for ax, ax_im, (r, ts), color in zip(
     axs_trace, axs_im, timeseries.items(), discrete_colors(len(timeseries))
@@ -125,8 +134,7 @@ for ax, ax_im, (r, ts), color in zip(
         edgecolor="w",
     )
 
-    kx, _ = static.kgrid()
-    dk = kx[0, 1] - kx[0, 0]
+    dk = static.dk
     yc, xc = static.center
     yi_, xi_ = static.miller_to_arrindex(0, 0, 2)
 
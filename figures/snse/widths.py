@@ -41,8 +41,7 @@ with DiffractionDataset(overnight4.path, mode="r") as dset:
 
         yi_, xi_ = overnight4.miller_to_arrindex(*refl)
         width = 40
-        kx, _ = overnight4.kgrid()
-        dk = kx[0, 1] - kx[0, 0]
+        dk = overnight4.dk
         k = dk * (
             np.arange(start=yi_ - width, stop=yi_ + width) - yi_
         )  # inverse angstroms
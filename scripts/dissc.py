@@ -7,19 +7,25 @@ This script is meant to be used as a command-line program:
 python -m dissc --help
 ```
 """
+
 import argparse
 import contextlib
+import hashlib
+import json
 import logging
 import multiprocessing as mp
 import os
 import shutil
 import subprocess
 import warnings
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from functools import wraps
 from pathlib import Path
 
 import termcolor
 
+import figcache
+
 logging.basicConfig(encoding="utf-8", level=logging.INFO)
 
 HERE = Path(os.getcwd())
@@ -27,6 +33,7 @@ BUILDDIR_PDF = HERE / "build"
 BUILDDIR_PDF.mkdir(exist_ok=True)
 
 LATEX_ENGINE = "lualatex"
+MAX_LATEX_RUNS = 5
 
 CONTENTDIR = HERE / "content"
 SRC = [
@@ -41,11 +48,93 @@ SRC = [
 
 BIBFILE = Path("references.bib")
 
+# Plotting prerequisites -------------------------------------------------------
+# Every script in scripts/prerequisites declares the data it reads ("inputs"),
+# the local modules it imports ("imports"), and the files it writes ("outputs").
+# Paths are relative to the root of the repository, and may be glob patterns.
+# A script is re-run only if the content of itself, of its imports (recursively),
+# or of its inputs has changed since its last successful run, or if an output
+# is missing. A script runs after the scripts it imports or whose outputs it reads.
+PREREQDIR = HERE / "scripts" / "prerequisites"
+PREREQ_MANIFEST = BUILDDIR_PDF / "cache" / "prerequisites.json"
+
+MODULES = {"dissutils": ["dissutils/dissutils/*.py"]}
+
+PREREQUISITES = {
+    "mkoneph": dict(
+        imports=["dissutils"],
+        inputs=[
+            "data/graphite/graphite.out",
+            "data/graphite/Gra-C_XDM_mode_grid_new2.json",
+        ],
+        outputs=["data/graphite/oneph/oneph.hdf5"],
+    ),
+    "mkdispersion": dict(
+        imports=["mkoneph", "dissutils"],
+        inputs=[],
+        outputs=[
+            "data/graphite/static-dispersion",
+            "data/graphite/weighted-dispersion",
+        ],
+    ),
+    "mkdecomp": dict(
+        imports=["mkoneph", "dissutils"],
+        inputs=["data/graphite/graphite_time_corrected_iris5.hdf5"],
+        outputs=["data/graphite/populations/population_timeseries.hdf5"],
+    ),
+    "mkestructure": dict(
+        imports=[],
+        inputs=["data/snse/estructure/*.csv"],
+        outputs=[
+            "data/snse/estructure/ky.npy",
+            "data/snse/estructure/kz.npy",
+            "data/snse/estructure/inplane-conduction.npy",
+            "data/snse/estructure/inplane-valence.npy",
+        ],
+    ),
+    "mkpolaron": dict(
+        imports=["dissutils"],
+        inputs=["data/snse/snse_pnma.cif", "data/snse/overnight4.hdf5"],
+        outputs=[
+            "data/snse/fast-diffuse-profile.csv",
+            "data/snse/slow-diffuse-profile.csv",
+        ],
+    ),
+    "mknpstreams-bench": dict(
+        imports=[],
+        inputs=[],
+        outputs=[
+            "data/introduction/npstreams-benchmark/times.npy",
+            "data/introduction/npstreams-benchmark/memory.npy",
+            "data/introduction/npstreams-benchmark/seqtimes.npy",
+        ],
+    ),
+}
+
+# Figures ---------------------------------------------------------------------
+# Figures are rendered ahead of pandoc by `render-figures`, and cached figures
+# are substituted for plot blocks by the figcache filter. A figure is rendered again
+# only if the content of its script, of the data files it read when last rendered,
+# of the plotting configuration, or of dissutils has changed.
+FIGURE_MANIFEST = HERE / figcache.MANIFEST
+
+# Incremental builds ----------------------------------------------------------
+# Every chapter is converted to its own LaTeX fragment, which is only converted
+# again if the chapter, its figures, or the files read by pandoc have changed.
+# Fragments are assembled in the main document with \include.
+CHAPTERDIR = BUILDDIR_PDF / "chapters"
+CHAPTER_MANIFEST = BUILDDIR_PDF / "cache" / "chapters.json"
+LATEX_MANIFEST = BUILDDIR_PDF / "cache" / "latex.json"
+
+# Options which only apply to the main document, not to chapter fragments
+DOCUMENT_OPTIONS = ("--standalone", "--toc", "--template", "--include-in-header", "-V ")
+
 OPTIONS = ["-f markdown+raw_tex+latex_macros"]
 OPTIONS += ["--standalone"]
 
 # The order of filters is important!
 OPTIONS += [
+    "--filter scripts/figcache.py",
     "--filter pandoc-plot",
     "--filter scripts/splice.py",
     "--filter pandoc-crossref",
@@ -92,10 +181,43 @@ parser_build.add_argument(
     help="Build the dissertation for printing media: no hyperlinks, single linespacing, etc.",
     default=False,
 )
+parser_build.add_argument(
+    "--incremental",
+    action="store_true",
+    help="Only convert chapters which have changed, and skip biber if citations are unchanged.",
+)
 
 parser_prereqs = subparsers.add_parser(
     "compute-prerequisites", help="Compute plotting prerequisites from data."
 )
+parser_prereqs.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=1,
+    help="Maximum number of prerequisite scripts running at the same time.",
+)
+parser_prereqs.add_argument(
+    "--force",
+    action="store_true",
+    help="Run all prerequisite scripts, even if they are up-to-date.",
+)
+
+parser_figures = subparsers.add_parser(
+    "render-figures", help="Render figures ahead of the pandoc pass."
+)
+parser_figures.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=os.cpu_count(),
+    help="Number of processes rendering figures.",
+)
+parser_figures.add_argument(
+    "--force",
+    action="store_true",
+    help="Render all figures, even if they are up-to-date.",
+)
 
 parser_format = subparsers.add_parser("format", help="Format Python files.")
 
@@ -110,11 +232,250 @@ def check_for_todo(path):
     return False
 
 
-def precompute_plots():
-    """Compute the plotting prerequisites."""
+def precompute_plots(jobs=1, force=False):
+    """
+    Compute the plotting prerequisites. Up-to-date prerequisites are skipped,
+    and independent ones are run in parallel, up to `jobs` at a time.
+    """
     logging.info("Running prerequisites")
-    for script in (HERE / "scripts" / "prerequisites").glob("*.py"):
-        run(f"python -OO {script.relative_to(HERE)}").check_returncode()
+    manifest = _load_manifest(PREREQ_MANIFEST)
+    memo = manifest.setdefault("files", dict())
+    done = manifest.setdefault("scripts", dict())
+
+    scripts = {script.stem: script for script in sorted(PREREQDIR.glob("*.py"))}
+    for name in scripts.keys() - PREREQUISITES.keys():
+        warnings.warn(
+            f"Prerequisite {name} has no declared dependencies and will always be run.",
+            category=RuntimeWarning,
+            stacklevel=0,
+        )
+    dependencies = {
+        name: _prerequisite_dependencies(name) & scripts.keys() for name in scripts
+    }
+
+    pending, finished, failed, running = set(scripts), set(), set(), dict()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while pending or running:
+            # Scripts whose dependencies failed are not run at all
+            for name in sorted(pending):
+                if dependencies[name] & failed:
+                    logging.error(f"Skipping {name}: a dependency has failed")
+                    pending.remove(name)
+                    failed.add(name)
+
+            ready = sorted(n for n in pending if dependencies[n] <= finished)
+            for name in ready:
+                if len(running) >= max(1, jobs):
+                    break
+                pending.remove(name)
+
+                key = _prerequisite_key(name, memo)
+                if not force and _is_up_to_date(name, key, done):
+                    logging.info(f"Prerequisite {name} is up-to-date")
+                    finished.add(name)
+                    continue
+
+                script = scripts[name].relative_to(HERE)
+                future = executor.submit(run, f"python -OO {script}")
+                running[future] = (name, key)
+
+            if not running:
+                if pending and not any(dependencies[n] <= finished for n in pending):
+                    raise RuntimeError(
+                        f"Circular dependencies between prerequisites {sorted(pending)}"
+                    )
+                continue
+
+            completed, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in completed:
+                name, key = running.pop(future)
+                if future.result().returncode == 0:
+                    finished.add(name)
+                    if key is not None:
+                        done[name] = key
+                    _save_manifest(manifest, PREREQ_MANIFEST)
+                else:
+                    logging.error(f"Prerequisite {name} has failed")
+                    failed.add(name)
+
+    if failed:
+        raise RuntimeError(f"Prerequisites failed: {sorted(failed)}")
+
+
+def render_figures(jobs=1, force=False):
+    """
+    Render the figures of plot blocks ahead of the pandoc pass, in `jobs` processes
+    which load the modules used by figure scripts only once. Up-to-date figures are
+    skipped. Figures which fail to render are left to pandoc-plot.
+    """
+    logging.info("Rendering figures")
+    config = figcache.read_config(HERE / figcache.CONFIG)
+    manifest = _load_manifest(FIGURE_MANIFEST)
+    memo = manifest.setdefault("files", dict())
+    figures = manifest.setdefault("figures", dict())
+
+    scripts = figcache.plot_scripts(SRC)
+    for script in figures.keys() - set(scripts):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(figures[script]["output"])
+        del figures[script]
+
+    stale = [
+        script
+        for script in scripts
+        if force or not figcache.is_rendered(script, figures.get(script), config, memo)
+    ]
+    logging.info(
+        f"{len(scripts) - len(stale)} of {len(scripts)} figures are up-to-date"
+    )
+    if not stale:
+        _save_manifest(manifest, FIGURE_MANIFEST)
+        return
+
+    (HERE / figcache.CACHEDIR).mkdir(parents=True, exist_ok=True)
+    tasks = [(s, figcache.output_path(s, config), config) for s in stale]
+    failed = list()
+    with mp.Pool(
+        processes=max(1, min(jobs, len(tasks))), initializer=figcache.init_worker
+    ) as pool:
+        for script, dependencies, error in pool.imap_unordered(
+            figcache.render_task, tasks
+        ):
+            if error is not None:
+                logging.error(f"Figure {script} has failed:\n{error}")
+                figures.pop(script, None)
+                failed.append(script)
+                continue
+
+            logging.info(f"Rendered {script}")
+            figures[script] = dict(
+                output=figcache.output_path(script, config).as_posix(),
+                dependencies=dependencies,
+                key=figcache.figure_key(script, dependencies, config, memo),
+            )
+            _save_manifest(manifest, FIGURE_MANIFEST)
+
+    _save_manifest(manifest, FIGURE_MANIFEST)
+    if failed:
+        warnings.warn(
+            f"Figures {sorted(failed)} failed to render, and are left to pandoc-plot.",
+            category=RuntimeWarning,
+            stacklevel=0,
+        )
+
+
+def _load_manifest(path):
+    """Load the record of previous runs and file hashes."""
+    with contextlib.suppress(FileNotFoundError, json.JSONDecodeError):
+        with open(path, mode="r") as f:
+            return json.load(f)
+    return dict()
+
+
+def _save_manifest(manifest, path):
+    """Save the record of previous runs and file hashes, atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, mode="w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _expand(patterns):
+    """Files matching path patterns relative to HERE. Directories are expanded."""
+    for pattern in patterns:
+        matches = sorted(HERE.glob(pattern))
+        if not matches:
+            yield pattern  # Missing inputs still contribute to hashes
+        for path in matches:
+            if path.is_dir():
+                yield from sorted(p for p in path.rglob("*") if p.is_file())
+            else:
+                yield path
+
+
+def _file_digest(path, memo):
+    """
+    Content hash of a file. Hashes are memoized in `memo`, keyed by path, size,
+    and modification time, so that large data files are only hashed when changed.
+    """
+    if not isinstance(path, Path):
+        return "missing"
+
+    stat = path.stat()
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    entry = memo.get(str(path.relative_to(HERE)))
+    if entry is not None and entry[:2] == stamp:
+        return entry[2]
+
+    hasher = hashlib.sha256()
+    with open(path, mode="rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            hasher.update(block)
+    memo[str(path.relative_to(HERE))] = stamp + [hasher.hexdigest()]
+    return hasher.hexdigest()
+
+
+def _prerequisite_closure(name):
+    """Names of all prerequisites and modules imported by `name`, recursively, including itself."""
+    closure, stack = set(), [name]
+    while stack:
+        current = stack.pop()
+        if current in closure:
+            continue
+        closure.add(current)
+        stack.extend(PREREQUISITES.get(current, dict()).get("imports", []))
+    return closure
+
+
+def _prerequisite_dependencies(name):
+    """Prerequisites which must run before `name`: those it imports, or whose outputs it reads."""
+    imports = _prerequisite_closure(name) - {name}
+    inputs = [Path(i) for i in PREREQUISITES.get(name, dict()).get("inputs", [])]
+    producers = {
+        other
+        for other, declaration in PREREQUISITES.items()
+        for output in map(Path, declaration["outputs"])
+        if any(i == output or output in i.parents for i in inputs)
+    }
+    return (imports | producers) - {name}
+
+
+def _prerequisite_key(name, memo):
+    """
+    Hash of everything which affects the outputs of prerequisite `name`, or None
+    if `name` has no declared dependencies.
+    """
+    if name not in PREREQUISITES:
+        return None
+
+    files = set()
+    for dependency in _prerequisite_closure(name):
+        if dependency in MODULES:
+            files.update(_expand(MODULES[dependency]))
+            continue
+        script = PREREQDIR / f"{dependency}.py"
+        files.update(_expand([str(script.relative_to(HERE))]))
+        files.update(_expand(PREREQUISITES.get(dependency, dict()).get("inputs", [])))
+
+    return _digest_files(files, memo)
+
+
+def _digest_files(files, memo):
+    """Hash of the paths and contents of many files, as yielded by `_expand`."""
+    hasher = hashlib.sha256()
+    for path in sorted(set(files), key=str):
+        relpath = path.relative_to(HERE) if isinstance(path, Path) else path
+        hasher.update(str(relpath).encode("utf-8"))
+        hasher.update(_file_digest(path, memo).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _is_up_to_date(name, key, done):
+    """Determine whether the prerequisite `name` has already been run with the same inputs."""
+    if key is None or done.get(name) != key:
+        return False
+    return all(any(HERE.glob(output)) for output in PREREQUISITES[name]["outputs"])
 
 
 @wraps(subprocess.run)
@@ -145,6 +506,88 @@ def runpandoc(options, target, sourcefiles):
     ).check_returncode()
 
 
+def runpandoc_chapters(options, target, sourcefiles):
+    """
+    Run pandoc on every source file separately, and assemble the resulting LaTeX
+    fragments into the target with \include. Fragments are cached, so that
+    only the source files which have changed are converted again.
+
+    Parameters
+    ----------
+    options : List[str]
+        List of options, e.g. ["--test true", "--foo=bar"]
+    target : path-like
+        Target file
+    sourcefiles : List[path-like]
+        List of source files
+
+    Returns
+    -------
+    fragments : List[Path]
+        LaTeX fragments, which must be found by LaTeX (e.g. through TEXINPUTS).
+    """
+    CHAPTERDIR.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(CHAPTER_MANIFEST)
+    memo = manifest.setdefault("files", dict())
+    chapters = manifest.setdefault("chapters", dict())
+    figures = _load_manifest(FIGURE_MANIFEST).get("figures", dict())
+
+    fragment_options = [o for o in options if not o.startswith(DOCUMENT_OPTIONS)]
+    stale = dict()
+    for source in map(Path, sourcefiles):
+        fragment = CHAPTERDIR / source.with_suffix(".tex").name
+        key = _chapter_key(source, fragment_options, figures, memo)
+        if chapters.get(source.name) == key and fragment.exists():
+            logging.info(f"Chapter {source.name} is up-to-date")
+        else:
+            stale[source] = (fragment, key)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(stale))) as executor:
+        futures = {
+            executor.submit(runpandoc, fragment_options, fragment, [source]): source
+            for source, (fragment, _) in stale.items()
+        }
+        for future in futures:
+            future.result()
+            source = futures[future]
+            chapters[source.name] = stale[source][1]
+            _save_manifest(manifest, CHAPTER_MANIFEST)
+
+    # pandoc sets the template variables `graphics` and `tables` when the body
+    # contains figures and tables, which the chapters do
+    includes = "\n".join(f"\\include{{{Path(s).stem}}}" for s in sourcefiles)
+    main = CHAPTERDIR / Path(target).with_suffix(".md").name
+    main.write_text(f"```{{=latex}}\n{includes}\n```\n", encoding="utf-8")
+    runpandoc(
+        options=options + ["-V graphics=true", "-V tables=true"],
+        target=target,
+        sourcefiles=[main],
+    )
+    return [CHAPTERDIR / Path(s).with_suffix(".tex").name for s in sourcefiles]
+
+
+def _chapter_key(source, options, figures, memo):
+    """
+    Hash of everything which affects the conversion of `source` by pandoc:
+    the source itself, options, metadata files, filter scripts, and figures.
+    """
+    files = [source, HERE / figcache.CONFIG]
+    for option in options:
+        if option.startswith("--metadata-file="):
+            files.append(Path(option.split("=", 1)[1]))
+        elif option.startswith("--filter") and (HERE / option.split()[1]).is_file():
+            files.append(HERE / option.split()[1])
+
+    scripts = figcache.plot_scripts([source])
+    files.extend(_expand(scripts))
+
+    hasher = hashlib.sha256()
+    hasher.update(_digest_files(files, memo).encode("utf-8"))
+    hasher.update(" ".join(options).encode("utf-8"))
+    hasher.update(json.dumps([figures.get(s) for s in scripts]).encode("utf-8"))
+    return hasher.hexdigest()
+
+
 def render_diagram(source, target):
     """Render SVG diagram `source` to `target`"""
     try:
@@ -159,9 +602,13 @@ def render_diagram(source, target):
         )
 
 
-def runlatex(source):
+def runlatex(source, incremental=False, env=None, max_runs=MAX_LATEX_RUNS):
     """
-    Run a full build of latex (i.e. latex, biber, 2xlatex)
+    Run latex and biber until the auxiliary files (.aux, .bcf, .toc, .bbl, ...)
+    are unchanged by a latex run, up to `max_runs` latex runs.
+
+    biber is run after a latex run if the citations have changed. If `incremental`,
+    citations are compared to the last biber run of a previous build as well.
     """
     # Important: the options -aux-directory is Miktex-only, so I'm not using it
     # so that this script also supports TexLive. Also, confusingly, Texlive uses -jobname
@@ -169,14 +616,77 @@ def runlatex(source):
     latex_options = (
         f" -interaction=batchmode -halt-on-error -output-directory={BUILDDIR_PDF}"
     )
-    run(f"{LATEX_ENGINE} {latex_options} --draftmode {source}").check_returncode()
-    run(f"biber --quiet build/{Path(source).stem}").check_returncode()
-    run(f"{LATEX_ENGINE} {latex_options} --draftmode {source}").check_returncode()
-    run(f"{LATEX_ENGINE} {latex_options} {source}").check_returncode()
+    stem = Path(source).stem
+    manifest = _load_manifest(LATEX_MANIFEST)
+    bibliography = manifest.get("bibliography") if incremental else None
+
+    # The first run of a fresh build cannot converge, so it does not need to produce a PDF
+    draft = not (BUILDDIR_PDF / f"{stem}.aux").exists()
+    state = _auxiliary_digests(stem)
+    for count in range(1, max_runs + 1):
+        draft = draft and count < max_runs
+        mode = "--draftmode" if draft else ""
+        run(
+            f"{LATEX_ENGINE} {latex_options} {mode} {source}", env=env
+        ).check_returncode()
+
+        key = _bibliography_key(stem)
+        if key == bibliography and (BUILDDIR_PDF / f"{stem}.bbl").exists():
+            logging.info(
+                f"Skipping biber after latex run {count}: citations are unchanged"
+            )
+        else:
+            run(f"biber --quiet build/{stem}").check_returncode()
+            bibliography = manifest["bibliography"] = key
+            _save_manifest(manifest, LATEX_MANIFEST)
+
+        previous, state = state, _auxiliary_digests(stem)
+        changed = sorted(
+            name
+            for name in state.keys() | previous.keys()
+            if previous.get(name) != state.get(name)
+        )
+        if not changed and not draft:
+            if count < max_runs:
+                logging.info(
+                    f"Skipping latex runs {count + 1} to {max_runs}: "
+                    f"auxiliary files are unchanged by latex run {count}"
+                )
+            return
+        if changed:
+            logging.info(f"Latex run {count} changed {', '.join(changed)}")
+        draft = False
+
+    warnings.warn(
+        f"Auxiliary files have not converged after {max_runs} latex runs. "
+        "Cross-references might be wrong.",
+        category=RuntimeWarning,
+        stacklevel=0,
+    )
+
+
+def _auxiliary_digests(stem):
+    """Hashes of the auxiliary files written by latex and biber, by file name."""
+    files = sorted(BUILDDIR_PDF.glob("*.aux"))
+    files += [
+        BUILDDIR_PDF / f"{stem}{ext}"
+        for ext in (".bcf", ".bbl", ".toc", ".lof", ".lot")
+    ]
+    memo = dict()
+    return {f.name: _file_digest(f, memo) for f in files if f.exists()}
+
+
+def _bibliography_key(stem):
+    """Hash of the citations, as written by latex for biber, and of the bibliography."""
+    files = [BUILDDIR_PDF / f"{stem}.bcf", HERE / BIBFILE]
+    return _digest_files((f if f.exists() else str(f) for f in files), memo=dict())
 
 
-def build(target, forprint=False):
-    """Build the dissertation from source."""
+def build(target, forprint=False, incremental=False):
+    """
+    Build the dissertation from source. If `incremental`, only the chapters
+    which have changed are converted, and biber is skipped if citations are unchanged.
+    """
 
     # Build diagrams
     diagrams = list((HERE / "diagrams").glob("*.svg"))
@@ -189,6 +699,10 @@ def build(target, forprint=False):
     if not (BUILDDIR_PDF / "titlepage.pdf").exists():
         run(f"python scripts/mktitlepage.py {BUILDDIR_PDF / 'titlepage.pdf'}")
 
+    # Figures are rendered ahead of pandoc, so that pandoc-plot only renders
+    # figures which could not be rendered in advance
+    render_figures(jobs=os.cpu_count())
+
     options = OPTIONS
     # The color DarkViolet is defined in the template
     if not forprint:
@@ -205,17 +719,32 @@ def build(target, forprint=False):
     # We purposefully bypass pandoc-citeproc because we want
     # to have references at the end of each chapter
     # This is much easier to do with biblatex.
-    runpandoc(
-        options=options,
-        target=BUILDDIR_PDF / target.with_suffix(".tex"),
-        sourcefiles=SRC,
-    )
+    if incremental:
+        fragments = runpandoc_chapters(
+            options=options,
+            target=BUILDDIR_PDF / target.with_suffix(".tex"),
+            sourcefiles=SRC,
+        )
+        env = dict(os.environ, TEXINPUTS=f"{CHAPTERDIR}{os.pathsep}")
+    else:
+        runpandoc(
+            options=options,
+            target=BUILDDIR_PDF / target.with_suffix(".tex"),
+            sourcefiles=SRC,
+        )
+        fragments, env = [], None
 
     # TODO: also check for undefined references in the log file
-    todo_left = check_for_todo(BUILDDIR_PDF / target.with_suffix(".tex"))
+    todo_left = any(
+        map(check_for_todo, [BUILDDIR_PDF / target.with_suffix(".tex"), *fragments])
+    )
 
     try:
-        runlatex(source=BUILDDIR_PDF / target.with_suffix(".tex"))
+        runlatex(
+            source=BUILDDIR_PDF / target.with_suffix(".tex"),
+            incremental=incremental,
+            env=env,
+        )
     except subprocess.CalledProcessError:
         print("--------------------------------")
         print("Error encountered. See log:")
@@ -250,11 +779,17 @@ def format_scripts():
 if __name__ == "__main__":
     arguments = parser.parse_args()
     if arguments.command == "build":
-        build(target=Path("dissertation.pdf"), forprint=arguments.print)
+        build(
+            target=Path("dissertation.pdf"),
+            forprint=arguments.print,
+            incremental=arguments.incremental,
+        )
     elif arguments.command == "clean":
         clean(full=arguments.all)
     elif arguments.command == "compute-prerequisites":
-        precompute_plots()
+        precompute_plots(jobs=arguments.jobs, force=arguments.force)
+    elif arguments.command == "render-figures":
+        render_figures(jobs=arguments.jobs, force=arguments.force)
     elif arguments.command == "format":
         format_scripts()
     else:
@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+
+"""
+Figures rendered ahead of time by `dissc render-figures`.
+
+Figure scripts are rendered in long-lived processes, where the modules they
+import are loaded once, exactly like pandoc-plot would render them:
+the preamble of the plotting configuration, followed by the script, followed
+by saving the current figure.
+
+This module is also a pandoc filter, which must run before pandoc-plot.
+Plot blocks whose figure has been rendered from the current version of their
+script, and of every file it read, are replaced by the cached figure; all other
+plot blocks are left for pandoc-plot to render.
+"""
+
+import contextlib
+import glob
+import hashlib
+import importlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import traceback
+import warnings
+from functools import wraps
+from pathlib import Path
+
+CACHEDIR = Path("build") / "figures"
+MANIFEST = Path("build") / "cache" / "figures.json"
+CONFIG = Path("plot-config.yml")
+
+# Modules imported by most figure scripts, loaded once per rendering process
+PRELOAD = [
+    "numpy",
+    "scipy",
+    "scipy.optimize",
+    "scipy.stats",
+    "matplotlib.pyplot",
+    "h5py",
+    "skimage.filters",
+    "skued",
+    "crystals",
+    "iris",
+    "dissutils",
+]
+
+# Files which affect every figure, besides the script and the files it reads
+COMMON_DEPENDENCIES = [str(CONFIG), "dissutils/dissutils/*.py"]
+
+# Plot blocks with any other attribute (e.g. `dpi`) are left to pandoc-plot
+ATTRIBUTES = {"file", "caption"}
+
+BLOCK = re.compile(r"^```\s*\{(?P<attributes>.*\.matplotlib.*)\}\s*$", re.MULTILINE)
+KEYVAL = re.compile(r'([\w-]+)="((?:[^"\\]|\\.)*)"')
+COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+
+# Files opened by the figure script currently rendering
+_OPENED = set()
+
+
+def read_config(path=CONFIG):
+    """Rendering options from the pandoc-plot configuration, with pandoc-plot's defaults."""
+    import yaml
+
+    with open(path, mode="r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or dict()
+    matplotlib = config.get("matplotlib", dict())
+    return dict(
+        dpi=config.get("dpi", 80),
+        format=config.get("format", "PNG").lower(),
+        caption_format=config.get("caption_format", "markdown+tex_math_dollars"),
+        preamble=matplotlib.get("preamble"),
+        tight_bbox=matplotlib.get("tight_bbox", False),
+        transparent=matplotlib.get("transparent", False),
+    )
+
+
+def plot_scripts(paths):
+    """
+    Figure scripts of the plot blocks in markdown files, in order of appearance.
+    Only plot blocks which can be served from the cache are considered, and plot
+    blocks inside HTML comments are ignored, like pandoc does.
+    """
+    scripts = dict()
+    for path in paths:
+        with open(path, mode="r", encoding="utf-8") as f:
+            text = COMMENT.sub("", f.read())
+        for match in BLOCK.finditer(text):
+            attributes = match.group("attributes")
+            keyvals = dict(KEYVAL.findall(attributes))
+            if "file" in keyvals and keyvals.keys() <= ATTRIBUTES:
+                scripts[keyvals["file"]] = None
+    return list(scripts)
+
+
+def output_path(script, config):
+    """Path of the cached figure rendered from `script`."""
+    name = Path(script).with_suffix("").as_posix().replace("/", "-")
+    return CACHEDIR / f"{name}.{config['format']}"
+
+
+def figure_key(script, dependencies, config, memo):
+    """
+    Hash of everything which affects the figure rendered from `script`: the script,
+    the files it read, the plotting configuration and preamble, and dissutils.
+    Paths are relative to the current directory. File hashes are memoized in `memo`.
+    """
+    patterns = [str(script), *COMMON_DEPENDENCIES, *dependencies]
+    if config["preamble"] is not None:
+        patterns.append(config["preamble"])
+
+    files = set()
+    for pattern in patterns:
+        # Missing files still contribute to the hash
+        files.update(glob.glob(pattern) or [pattern])
+
+    hasher = hashlib.sha256()
+    for path in sorted(files):
+        hasher.update(path.encode("utf-8"))
+        hasher.update(_file_digest(path, memo).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def is_rendered(script, entry, config, memo):
+    """Determine whether the figure of `script`, recorded in `entry`, is up-to-date."""
+    if entry is None or not Path(entry["output"]).is_file():
+        return False
+    return entry["key"] == figure_key(script, entry["dependencies"], config, memo)
+
+
+def _file_digest(path, memo):
+    """
+    Content hash of a file. Hashes are memoized in `memo`, keyed by path, size,
+    and modification time, so that large data files are only hashed when changed.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "missing"
+
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    entry = memo.get(path)
+    if entry is not None and entry[:2] == stamp:
+        return entry[2]
+
+    hasher = hashlib.sha256()
+    with open(path, mode="rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            hasher.update(block)
+    memo[path] = stamp + [hasher.hexdigest()]
+    return hasher.hexdigest()
+
+
+def init_worker():
+    """Initializer of rendering processes: preload modules and track dependencies."""
+    preload()
+    track_dependencies()
+
+
+def preload():
+    """Import the modules used by figure scripts, once per process."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    for module in PRELOAD:
+        with contextlib.suppress(ImportError):
+            importlib.import_module(module)
+
+
+def track_dependencies():
+    """
+    Record the files opened by figure scripts, which are returned by `render_figure`.
+    Audit hooks cannot be removed, so this is only meant for rendering processes.
+    """
+    # HDF5 files are opened by the HDF5 library directly, bypassing `open`
+    if "h5py" in sys.modules:
+        h5py = sys.modules["h5py"]
+        h5py.File.__init__ = _audited(h5py.File.__init__)
+    sys.addaudithook(_record_open)
+
+
+def render_figure(script, target, config):
+    """
+    Render the figure script `script` to `target`, like pandoc-plot would.
+    Modules used by the script should have been preloaded with `preload`, and
+    files read by the script are only known if `track_dependencies` was called.
+
+    Parameters
+    ----------
+    script : path-like
+        Figure script.
+    target : path-like
+        Path of the rendered figure.
+    config : dict
+        Rendering options, as returned by `read_config`.
+
+    Returns
+    -------
+    dependencies : list[str]
+        Files read by the script, relative to the current directory.
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    # Every script starts from the same state as a new interpreter
+    plt.close("all")
+    matplotlib.rc_file_defaults()
+    namespace = {"__name__": "__main__", "__file__": str(script)}
+
+    target = Path(target)
+    tmp = target.with_name(f".tmp-{target.name}")
+    _OPENED.clear()
+    with warnings.catch_warnings(), np.errstate():
+        sources = (
+            [script] if config["preamble"] is None else [config["preamble"], script]
+        )
+        for source in sources:
+            with open(source, mode="r", encoding="utf-8") as f:
+                exec(compile(f.read(), str(source), "exec"), namespace)
+        plt.savefig(
+            tmp,
+            format=config["format"],
+            dpi=config["dpi"],
+            transparent=config["transparent"],
+            bbox_inches="tight" if config["tight_bbox"] else None,
+        )
+    plt.close("all")
+    os.replace(tmp, target)
+    return _dependencies()
+
+
+def render_task(task):
+    """
+    Render a figure from a task (script, target, config), suitable for process pools.
+    Returns the script, the files it read, and the traceback if rendering failed.
+    """
+    script, target, config = task
+    try:
+        return script, render_figure(script, target, config), None
+    except (Exception, SystemExit):
+        return script, None, traceback.format_exc()
+
+
+def _audited(init):
+    """Wrap the initializer of h5py.File so that opening a file raises an audit event."""
+
+    @wraps(init)
+    def wrapper(self, name, *args, **kwargs):
+        if isinstance(name, (str, bytes, os.PathLike)):
+            sys.audit("open", name, None, 0)
+        return init(self, name, *args, **kwargs)
+
+    return wrapper
+
+
+def _record_open(event, args):
+    """Audit hook which records the files opened by figure scripts."""
+    if event == "open" and isinstance(args[0], (str, bytes, os.PathLike)):
+        _OPENED.add(os.fsdecode(args[0]))
+
+
+def _dependencies():
+    """Files in this repository opened since the last render, except build products."""
+    here = Path.cwd()
+    dependencies = set()
+    for name in _OPENED:
+        path = Path(name).absolute()
+        if not path.is_relative_to(here) or not path.is_file():
+            continue
+        relpath = path.relative_to(here)
+        if relpath.parts[0] == "build" or relpath.suffix == ".pyc":
+            continue
+        dependencies.add(relpath.as_posix())
+    return sorted(dependencies)
+
+
+# Pandoc filter ---------------------------------------------------------------
+
+
+def _caption(text, caption_format):
+    """Parse a figure caption into pandoc inline elements."""
+    if not text:
+        return []
+    parsed = subprocess.run(
+        ["pandoc", "-f", caption_format, "-t", "json"],
+        input=text,
+        capture_output=True,
+        encoding="utf-8",
+        check=True,
+    )
+    return [
+        inline for block in json.loads(parsed.stdout)["blocks"] for inline in block["c"]
+    ]
+
+
+def cached_figure(key, value, format, meta, api, figures, config, memo):
+    """Replace a plot block by its cached figure, if up-to-date."""
+    if key != "CodeBlock":
+        return
+
+    (identifier, classes, keyvals), _ = value
+    attributes = dict(keyvals)
+    if "matplotlib" not in classes or "file" not in attributes:
+        return
+    if not attributes.keys() <= ATTRIBUTES:
+        return
+
+    entry = figures.get(attributes["file"])
+    if not is_rendered(attributes["file"], entry, config, memo):
+        return
+
+    caption = _caption(attributes.get("caption", ""), config["caption_format"])
+    # Pandoc 3 (API 1.23) has a dedicated Figure element
+    if api >= [1, 23]:
+        image = {"t": "Image", "c": [["", [], []], caption, [entry["output"], ""]]}
+        return {
+            "t": "Figure",
+            "c": [
+                [identifier, [], []],
+                [None, [{"t": "Plain", "c": caption}] if caption else []],
+                [{"t": "Plain", "c": [image]}],
+            ],
+        }
+    image = {
+        "t": "Image",
+        "c": [[identifier, [], []], caption, [entry["output"], "fig:"]],
+    }
+    return {"t": "Para", "c": [image]}
+
+
+if __name__ == "__main__":
+    from pandocfilters import applyJSONFilters
+
+    source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8").read()
+    api = json.loads(source)["pandoc-api-version"]
+
+    manifest = dict()
+    with contextlib.suppress(FileNotFoundError, json.JSONDecodeError):
+        with open(MANIFEST, mode="r") as f:
+            manifest = json.load(f)
+    figures, memo = manifest.get("figures", dict()), manifest.get("files", dict())
+    config = read_config()
+
+    action = lambda key, value, format, meta: cached_figure(
+        key, value, format, meta, api, figures, config, memo
+    )
+    format = sys.argv[1] if len(sys.argv) > 1 else ""
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    sys.stdout.write(applyJSONFilters([action], source, format))
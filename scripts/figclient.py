@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+"""
+Run a Python script like `python script.py` would, but in the figure server
+(see scripts/figserver.py) if it is running. Otherwise, the script is run
+by a new interpreter.
+
+This is meant to be used as pandoc-plot's matplotlib executable. This client
+only imports modules which are part of the standard library, so that it starts quickly.
+"""
+
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+SOCKET = Path(__file__).resolve().parent.parent / "build" / "figserver.sock"
+
+
+def main(argv):
+    """Run the script and arguments `argv` in the figure server, returning its exit code."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(SOCKET))
+    except OSError:
+        client.close()
+        os.execv(sys.executable, [sys.executable, *argv])
+
+    request = dict(argv=argv, cwd=os.getcwd(), environ=dict(os.environ))
+    with client:
+        # The script writes directly to our standard streams
+        socket.send_fds(client, [b"\0"], [0, 1, 2])
+        client.sendall(json.dumps(request).encode("utf-8"))
+        client.shutdown(socket.SHUT_WR)
+
+        reply = b""
+        while chunk := client.recv(64):
+            reply += chunk
+
+    # No reply means that the server was interrupted while running the script
+    return int(reply) if reply else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,113 @@
+"""
+Figure server, which runs figure scripts from an interpreter where the modules
+used by figure scripts are already loaded.
+
+Every script runs in a child process forked from the server, so that it starts
+from a clean `pyplot` state and cannot affect other scripts. Scripts are submitted
+through a Unix socket by scripts/figclient.py. To render figures with the server,
+start it in the background:
+
+```
+python scripts/figserver.py
+```
+
+and set the matplotlib executable of pandoc-plot to scripts/figclient.py in plot-config.yml.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import runpy
+import signal
+import socket
+import sys
+import traceback
+
+import figcache
+from figclient import SOCKET
+
+logging.basicConfig(encoding="utf-8", level=logging.INFO)
+
+
+def serve(path=SOCKET):
+    """Serve requests to run scripts until interrupted."""
+    logging.info("Preloading modules")
+    figcache.preload()
+
+    # Children are reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(path))
+        server.listen()
+        logging.info(f"Serving figures on {path}")
+        try:
+            while True:
+                connection, _ = server.accept()
+                if os.fork() == 0:
+                    server.close()
+                    _handle(connection)
+                connection.close()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            logging.info("Shutting down")
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+
+def _handle(connection):
+    """Run the script requested on `connection`, in a forked child. Never returns."""
+    for signum in (signal.SIGCHLD, signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_DFL)
+    returncode = 1
+    try:
+        _, fds, _, _ = socket.recv_fds(connection, 1, maxfds=3)
+        message = b""
+        while chunk := connection.recv(2**16):
+            message += chunk
+        request = json.loads(message)
+
+        # The script uses the standard streams, working directory, and environment of the client
+        for fd, stream in zip(fds, (sys.stdin, sys.stdout, sys.stderr)):
+            os.dup2(fd, stream.fileno())
+            os.close(fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["environ"])
+
+        returncode = _run(request["argv"])
+    finally:
+        with contextlib.suppress(OSError):
+            sys.stdout.flush()
+            sys.stderr.flush()
+            connection.sendall(str(returncode).encode("utf-8"))
+            connection.close()
+        os._exit(0)
+
+
+def _run(argv):
+    """Run a script as `python *argv` would, returning its exit code."""
+    script = argv[0]
+    sys.argv = list(argv)
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as exc:
+        if exc.code is None or isinstance(exc.code, int):
+            return exc.code or 0
+        print(exc.code, file=sys.stderr)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    serve()
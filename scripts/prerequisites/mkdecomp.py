@@ -2,21 +2,28 @@
 """
 Decompose diffraction patterns into mode populations and store them.
 """
+
+import argparse
+import atexit
+import contextlib
 import itertools as it
+import multiprocessing as mp
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 import h5py as h5
 import npstreams as ns
 import numpy as np
 import scipy.interpolate as interpolate
-import scipy.optimize as opt
+import scipy.ndimage as ndimage
 from iris import DiffractionDataset
 from mkoneph import (
     IN_PLANE_MODES,
     debye_waller_factors,
     mapply,
-    one_phonon_structure_factor,
+    mode_structure_factors,
     prepare_modes,
 )
 from skimage.filters import gaussian
@@ -24,7 +31,7 @@ from skimage.transform import rotate
 from skued import detector_scattvectors, nfold
 from tqdm import tqdm
 
-from dissutils import GRAPHITE_ANGLE, GRAPHITE_CAMERA_LENGTH
+from dissutils import GRAPHITE_ANGLE, GRAPHITE_CAMERA_LENGTH, Regridder
 
 INPUT = Path("data") / "graphite"
 OUTPUT = INPUT / "populations"
@@ -52,9 +59,95 @@ QX, QY, _ = detector_scattvectors(
 QQ = np.sqrt(QX**2 + QY**2)
 
 
+class TableSmoother:
+    """
+    Gaussian smoothing of tables of scattered points.
+
+    Values are linearly interpolated onto a regular grid, smoothed with a
+    Gaussian kernel, and interpolated back onto the points. The triangulation
+    of the points and all interpolation weights are computed once, so that
+    smoothing many value arrays defined on the same points is cheap.
+
+    Parameters
+    ----------
+    points : ndarray, shape (N, 3)
+        Every row corresponds to points
+    size : int, optional
+        Number of rows and columns of the intermediate regular grid.
+    """
+
+    def __init__(self, points, size=512):
+        makx = max([abs(points[:, 0].min()), abs(points[:, 0].max())])
+        maxy = max([abs(points[:, 1].min()), abs(points[:, 1].max())])
+        xs, ys = np.linspace(-makx, makx, size), np.linspace(-maxy, maxy, size)
+        kx, ky = np.meshgrid(xs, ys)
+
+        self._to_grid = Regridder(
+            points=points[:, 0:2], xi=(kx, ky), method="linear", fill_value=0.0
+        )
+
+        # Weights of the bilinear interpolation back onto the points.
+        # Note that the first axis of the smoothed grid is associated with `xs`,
+        # as in previous calculations based on RegularGridInterpolator.
+        self._back = [
+            _linear_weights(grid, coords) for grid, coords in zip((xs, ys), points.T)
+        ]
+
+    def __call__(self, *values, sigma=5):
+        """
+        Smooth tables of values.
+
+        Parameters
+        ----------
+        values : ndarrays, shape (N,) or (N, 1)
+            Value at every point. All arrays are smoothed together.
+        sigma : float
+            Standard deviation for Gaussian kernel, in grid pixels.
+
+        Returns
+        -------
+        smoothed : ndarray or tuple of ndarrays, shapes (N,)
+        """
+        gridded = self._to_grid(*values)
+        if len(values) == 1:
+            gridded = (gridded,)
+        stacked = np.stack([np.reshape(g, g.shape[0:2]) for g in gridded], axis=-1)
+
+        # Same kernel as skimage.filters.gaussian, but channels are not mixed
+        smoothed = ndimage.gaussian_filter(
+            stacked, sigma=(sigma, sigma, 0), mode="nearest", truncate=4.0
+        )
+
+        (ix, tx, inx), (iy, ty, iny) = self._back
+        interpolated = (
+            ((1 - tx) * (1 - ty))[:, None] * smoothed[ix, iy]
+            + (tx * (1 - ty))[:, None] * smoothed[ix + 1, iy]
+            + ((1 - tx) * ty)[:, None] * smoothed[ix, iy + 1]
+            + (tx * ty)[:, None] * smoothed[ix + 1, iy + 1]
+        )
+        interpolated[~(inx & iny)] = 0.0
+
+        results = tuple(interpolated.T)
+        if len(results) == 1:
+            return results[0]
+        return results
+
+
+def _linear_weights(grid, coords):
+    """
+    Indices and weights for the linear interpolation on a regular, ascending `grid`
+    at `coords`, as well as whether `coords` are within the bounds of the grid.
+    """
+    indices = np.clip(np.searchsorted(grid, coords) - 1, 0, len(grid) - 2)
+    weights = (coords - grid[indices]) / (grid[indices + 1] - grid[indices])
+    inbounds = (coords >= grid[0]) & (coords <= grid[-1])
+    return indices, weights, inbounds
+
+
 def gaussian_table(points, values, sigma=5):
     """
-    Perform gaussian smoothing on a table of points
+    Perform gaussian smoothing on a table of points.
+    To smooth many tables defined on the same points, use `TableSmoother`.
 
     Parameters
     ----------
@@ -65,29 +158,106 @@ def gaussian_table(points, values, sigma=5):
     sigma : float
         Standard deviation for Gaussian kernel
     """
-    makx = max([abs(points[:, 0].min()), abs(points[:, 0].max())])
-    maxy = max([abs(points[:, 1].min()), abs(points[:, 1].max())])
-    kx, ky = np.meshgrid(np.linspace(-makx, makx, 512), np.linspace(-maxy, maxy, 512))
-
-    interpolated = np.squeeze(
-        interpolate.griddata(
-            points=points[:, 0:2],
-            values=values,
-            xi=(kx, ky),
-            method="linear",
-            fill_value=0.0,
+    return TableSmoother(points)(values, sigma=sigma)
+
+
+class ScatteringStream:
+    """
+    Stream of scattering patterns, processed and interpolated onto q-points.
+    Negative scattering is no doubt due to Debye-Waller factor's
+    influence on elastic scattering; we remove it.
+
+    The dataset is opened once, and the equilibrium pattern and valid mask are
+    only read once. While a time-delay is processed, the next diffraction pattern
+    is read in the background.
+
+    Parameters
+    ----------
+    q_points : ndarray, shape (N, 3)
+        Q-points on which to interpolate the scattering patterns.
+    path : path-like, optional
+        Path to the dataset.
+    """
+
+    def __init__(self, q_points, path=INPUT / "graphite_time_corrected_iris5.hdf5"):
+        self.q_points = q_points
+        self.dataset = DiffractionDataset(path, mode="r")
+        self.diff_eq = self.dataset.diff_eq()
+        self.valid_mask = self.dataset.valid_mask
+        self._reader = ThreadPoolExecutor(max_workers=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        self._reader.shutdown()
+        self.dataset.close()
+
+    def process(self, pattern):
+        """
+        Process a diffraction pattern and interpolate it onto `ScatteringStream.q_points`.
+
+        Returns
+        -------
+        interpolated : ndarray, shape (N,)
+        """
+        # Decomposition is very sensitive; results were
+        # optimize before Lorentz factor correction.
+        # Therefore, we keep it that way.
+        image = nfold(
+            pattern - self.diff_eq,
+            mod=6,
+            center=(c, r),
+            mask=self.valid_mask,
+            fill_value=0,
         )
-    )
+        image[QQ < 1.5] = 0
+        image[:] = rotate(image, angle=GRAPHITE_ANGLE, center=(c, r), mode="reflect")
 
-    smoothed = gaussian(interpolated, sigma=sigma)
+        gaussian(image, sigma=10, output=image)
 
-    return interpolate.RegularGridInterpolator(
-        points=(kx[0, :], ky[:, 0]),
-        values=smoothed,
-        method="linear",
-        bounds_error=False,
-        fill_value=0.0,
-    ).__call__(points[:, 0:2])
+        interpolated = interpolate.RegularGridInterpolator(
+            points=(QX[0, :], QY[:, 0]),
+            values=image.T,
+            method="linear",
+            bounds_error=False,
+            fill_value=0.0,
+        ).__call__(self.q_points[:, 0:2])
+
+        # Negative scattering is no doubt due to Debye-Waller factor's influence on
+        # elastic scattering. We remove it.
+        interpolated[interpolated < 0] = 0.0
+        return interpolated
+
+    def __call__(self, time):
+        """Scattering at a single time-delay [ps], interpolated onto q-points."""
+        return self.process(self.dataset.diff_data(time))
+
+    def stream(self, times):
+        """
+        Iterate over scattering patterns, interpolated onto q-points.
+        The diffraction pattern for the next time-delay is read while the current
+        one is being processed and consumed.
+
+        Yields
+        ------
+        time : float
+            Time-delay [ps].
+        interpolated : ndarray, shape (N,)
+        """
+        times = list(times)
+        if not times:
+            return
+
+        pending = self._reader.submit(self.dataset.diff_data, times[0])
+        for index, time in enumerate(times):
+            pattern = pending.result()
+            if index + 1 < len(times):
+                pending = self._reader.submit(self.dataset.diff_data, times[index + 1])
+            yield time, self.process(pattern)
 
 
 def extract_scattering(time, q_points):
@@ -96,74 +266,278 @@ def extract_scattering(time, q_points):
     Negative scattering is no doubt due to Debye-Waller factor's
     influence on elastic scattering; we remove it.
 
+    To extract scattering for many time-delays, use `ScatteringStream`.
+
     Parameters
     ----------
     time : float
         Time-delay [ps].
-    qx, qy : ndarray, shape (X,Y)
-        Meshgrid on which the image should be interpolated.
+    q_points : ndarray, shape (N, 3)
+        Q-points on which the image should be interpolated.
 
     Returns
     -------
-    interpolated : ndarray, shape (X, Y)
-        Image interpolated at `qx` and `qy`.
+    interpolated : ndarray, shape (N,)
+        Image interpolated at `q_points`.
     """
-    # Decomposition is very sensitive; results were
-    # optimize before Lorentz factor correction.
-    # Therefore, we keep it that way.
-    with DiffractionDataset(INPUT / "graphite_time_corrected_iris5.hdf5") as dset:
-        image = nfold(
-            dset.diff_data(time) - dset.diff_eq(),
-            mod=6,
-            center=(c, r),
-            mask=dset.valid_mask,
-            fill_value=0,
-        )
-    image[QQ < 1.5] = 0
-    image[:] = rotate(image, angle=GRAPHITE_ANGLE, center=(c, r), mode="reflect")
+    with ScatteringStream(q_points=q_points) as stream:
+        return stream(time)
 
-    gaussian(image, sigma=10, output=image)
 
-    interpolated = interpolate.RegularGridInterpolator(
-        points=(QX[0, :], QY[:, 0]),
-        values=image.T,
-        method="linear",
-        bounds_error=False,
-        fill_value=0.0,
-    ).__call__(q_points[:, 0:2])
+def _masked_lstsq(AtA, Atb, passive):
+    """
+    Solve a stack of least-squares problems from their normal equations,
+    where only the variables in the `passive` set are allowed to be non-zero.
+    """
+    # Rows and columns outside of the passive set are replaced by
+    # the identity, so that those variables are exactly zero.
+    mask = passive[:, :, None] & passive[:, None, :]
+    system = np.where(mask, AtA, 0)
+    diagonal = np.einsum("kii->ki", system)
+    diagonal[~passive] = 1
+    rhs = np.where(passive, Atb, 0)[..., None]
+    try:
+        return np.linalg.solve(system, rhs)[..., 0]
+    except np.linalg.LinAlgError:
+        # Some systems are singular, e.g. when modes have linearly dependent
+        # structure factors. Their least-squares solution of minimum norm is used.
+        return (np.linalg.pinv(system, hermitian=True) @ rhs)[..., 0]
+
+
+def batched_nnls(A, b, maxiter=None):
+    """
+    Solve a stack of non-negative least-squares problems, i.e. find x >= 0
+    which minimizes ||A x - b|| for every system in the stack.
 
-    # Negative scattering is no doubt due to Debye-Waller factor's influence on
-    # elastic scattering. We remove it.
-    interpolated[interpolated < 0] = 0.0
-    return interpolated
+    This is a vectorized version of the Lawson-Hanson active-set algorithm
+    used by `scipy.optimize.nnls`, where all systems are iterated at once.
+    Systems are solved via their normal equations, which are small.
 
+    Parameters
+    ----------
+    A : ndarray, shape (K, M, N)
+        Stack of K matrices.
+    b : ndarray, shape (K, M)
+        Stack of K right-hand side vectors.
+    maxiter : int or None, optional
+        Maximum number of iterations. Default is 3 * N.
 
-def optimize(factors, intensities, **kwargs):
+    Returns
+    -------
+    x : ndarray, shape (K, N)
+        Solution vectors.
     """
-    Optimize for the distribution of populations.
+    nsys, m, n = A.shape
+    if maxiter is None:
+        maxiter = 3 * n
+
+    # The one-phonon structure factors are very small numbers. Normalizing
+    # every system improves the conditioning of the normal equations.
+    scale = np.abs(A).max(axis=(1, 2), keepdims=True)
+    scale[scale == 0] = 1
+    A = A / scale
+    AtA = np.einsum("kmi,kmj->kij", A, A)
+    Atb = np.einsum("kmi,km->ki", A, b)
+
+    eps = 10 * max(m, n) * np.finfo(float).eps
+    wtol = eps * np.abs(b).max(axis=1, keepdims=True)
+
+    x = np.zeros(shape=(nsys, n), dtype=float)
+    passive = np.zeros_like(x, dtype=bool)
+
+    def gradient(index):
+        return Atb[index] - np.einsum("kij,kj->ki", AtA[index], x[index])
+
+    def has_candidates(index):
+        candidates = np.logical_not(passive[index]) & (w[index] > wtol[index])
+        return np.any(candidates, axis=1)
+
+    w = gradient(slice(None))
+    active = has_candidates(slice(None))
+
+    for _ in range(maxiter):
+        index = np.flatnonzero(active)
+        if index.size == 0:
+            break
+
+        # Move the variable with the most positive gradient to the passive set
+        candidates = np.where(passive[index], -np.inf, w[index])
+        passive[index, np.argmax(candidates, axis=1)] = True
+
+        # Inner loop: systems which lead to infeasible solutions are moved
+        # back towards the feasible region, until all solutions are feasible.
+        inner = index
+        for _ in range(n):
+            s = _masked_lstsq(AtA[inner], Atb[inner], passive[inner])
+            nonpositive = passive[inner] & (s <= 0)
+            feasible = np.logical_not(np.any(nonpositive, axis=1))
+            x[inner[feasible]] = s[feasible]
+
+            infeasible = np.logical_not(feasible)
+            inner, s = inner[infeasible], s[infeasible]
+            nonpositive = nonpositive[infeasible]
+            if inner.size == 0:
+                break
+
+            xi, pi = x[inner], passive[inner]
+            step = np.zeros_like(xi)
+            np.divide(xi, xi - s, out=step, where=nonpositive & (xi - s > 0))
+            alpha = np.where(nonpositive, step, np.inf).min(axis=1, keepdims=True)
+
+            xi = xi + alpha * (s - xi)
+            xtol = eps * np.maximum(np.abs(xi), np.abs(s)).max(axis=1, keepdims=True)
+            pi &= xi > xtol
+            x[inner], passive[inner] = np.where(pi, xi, 0), pi
+
+        w[index] = gradient(index)
+        active[index] = has_candidates(index)
+
+    return x / scale[:, :, 0]
+
+
+@lru_cache(maxsize=None)
+def _solver_pool(processes):
     """
-    assert factors.shape[0:2] == intensities.shape
+    Pool of `processes` worker processes, created once and re-used across time points.
+    It is terminated when the interpreter exits.
+    """
+    pool = mp.Pool(processes)
+    atexit.register(pool.terminate)
+    return pool
 
-    nk, _, nmodes = factors.shape
 
-    final_shape = (nk, nmodes)
-    solution = np.empty(shape=final_shape, dtype=float)
-    errors = np.empty_like(solution)
+def _solve(factors, intensities, processes=1):
+    """Solve all systems of equations, possibly split across processes."""
+    if processes > 1:
+        chunks = zip(
+            np.array_split(factors, processes, axis=0),
+            np.array_split(intensities, processes, axis=0),
+        )
+        solutions = _solver_pool(processes).starmap(batched_nnls, chunks)
+        return np.concatenate(solutions, axis=0)
+    return batched_nnls(factors, intensities)
 
-    for k_index in range(nk):
-        system = factors[k_index]
-        sol, *_ = opt.nnls(A=system, b=intensities[k_index], maxiter=100)
-        solution[k_index, :] = sol
 
+def _errors(factors):
+    """Estimate the errors on the populations."""
     # Estimation of the errors can be done in one step because
     # numpy.linalg.pinv can act on stacks of matrices
     #
     # See Eq 5.98
     #   E. L. Robinson, `Data Analysis for Scientists and Engineers` (2016)
     #   Princeton University Press
-    errors = np.sqrt(np.abs(np.diagonal(np.linalg.pinv(factors), axis1=1, axis2=2)))
+    return np.sqrt(np.abs(np.diagonal(np.linalg.pinv(factors), axis1=1, axis2=2)))
+
+
+def optimize(factors, intensities, processes=1, **kwargs):
+    """
+    Optimize for the distribution of populations.
+
+    Parameters
+    ----------
+    factors : ndarray, shape (nk, nbz, nmodes)
+        One system of equations for every k-point.
+    intensities : ndarray, shape (nk, nbz)
+    processes : int, optional
+        Number of processes across which to split the systems of equations.
+    """
+    assert factors.shape[0:2] == intensities.shape
+
+    # All systems of equations are solved at once
+    solution = _solve(factors, intensities, processes=processes)
+    return solution, _errors(factors)
+
+
+class Decomposition:
+    """
+    Decomposition of diffuse intensity into mode populations,
+    inside a single Brillouin zone.
+
+    Everything that does not depend on time, most importantly the system of
+    equations and the error estimates, is computed once when the decomposition
+    is created. Time-points are then streamed through the decomposition.
+
+    Parameters
+    ----------
+    exclude : iterable of str, optional
+        Modes to exclude from the decomposition.
+    processes : int, optional
+        Number of processes across which to split the systems of equations.
+    """
+
+    def __init__(self, exclude=tuple(), processes=1):
+        exclude = set(exclude)
+        self.mode_names = sorted(set(IN_PLANE_MODES) - exclude)
+        self.processes = processes
+
+        refls = [-3, -2, -1, 0, 1, 2, 3]
+        reflections = tuple(
+            filter(lambda t: t != (0, 0, 0), it.product(refls, refls, [0]))
+        )
+        modes = prepare_modes(reflections=reflections, decimate=DECIMATION)
+        modes = {
+            name: mode.filter_gamma(GAMMA_RADIUS) for name, mode in modes.items()
+        }  # Too close to the bragg peak, intensity is misleading
+
+        Ms = debye_waller_factors(modes)
+
+        self.q_points = modes["LA"].q_points
+        self.nbz = len(reflections)
+        self.nk = int(self.q_points.shape[0] / self.nbz)
+        nmodes = len(self.mode_names)
+
+        # There is one system of equation per reduced wavevector k
+        # Therefore, axes 1 and 2 are along modes and reflections
+        # while axis 0 is along wavevectors
+        self.system = np.zeros(shape=(self.nk, self.nbz, nmodes), dtype=float)
+
+        # Structure factors of all modes are computed at once, sharing
+        # atomic form factors and Debye-Waller factors.
+        oneph = mode_structure_factors(
+            [modes[mode_name] for mode_name in self.mode_names], dw_factors=Ms
+        )
+
+        weights = [
+            np.abs(oneph[mode_index]) ** 2 / modes[mode_name].frequencies
+            for mode_index, mode_name in enumerate(self.mode_names)
+        ]
+
+        # Perform smoothing of all modes at once. All modes share the
+        # same q-points, and hence the same interpolation weights
+        smoothed = TableSmoother(self.q_points)(*weights, sigma=5)
+        if nmodes == 1:
+            smoothed = (smoothed,)
 
-    return solution, errors
+        for mode_index, weights in enumerate(smoothed):
+            # Rows are ordered by reflection, such that every
+            # block of `nk` rows is related to a single reflection
+            self.system[:, :, mode_index] = np.reshape(weights, (self.nbz, self.nk)).T
+
+        self.errors = _errors(self.system)
+
+    def solve(self, extracted_intensities):
+        """
+        Determine the population breakdown for all modes, from the
+        intensities at every one of the q-points `Decomposition.q_points`.
+
+        Returns
+        -------
+        pop : dict[str, ndarray]
+            Population changes for each in-plane mode
+        """
+        intensities = np.reshape(extracted_intensities, (self.nbz, self.nk)).T
+        pop = _solve(self.system, intensities, processes=self.processes)
+        return {name: pop[:, index] for index, name in enumerate(self.mode_names)}
+
+    def __call__(self, time):
+        """Determine the population breakdown for all modes at a time-delay [ps]."""
+        return self.solve(shared_stream(self.q_points)(time))
+
+
+@lru_cache(maxsize=None)
+def decomposition(exclude=frozenset()):
+    """Decomposition for a set of excluded modes, created only once."""
+    return Decomposition(exclude=exclude)
 
 
 def population(kx, ky, time, exclude=tuple()):
@@ -183,60 +557,99 @@ def population(kx, ky, time, exclude=tuple()):
     pop : dict[str, ndarray]
         Population changes for each in-plane mode
     """
-    exclude = set(exclude)
-    mode_names = sorted(set(IN_PLANE_MODES) - exclude)
+    return decomposition(frozenset(exclude))(time)
 
-    refls = [-3, -2, -1, 0, 1, 2, 3]
-    reflections = tuple(filter(lambda t: t != (0, 0, 0), it.product(refls, refls, [0])))
-    modes = prepare_modes(reflections=reflections, decimate=DECIMATION)
-    modes = {
-        name: mode.filter_gamma(GAMMA_RADIUS) for name, mode in modes.items()
-    }  # Too close to the bragg peak, intensity is misleading
 
-    Ms = debye_waller_factors(modes)
+# Per-process scattering stream, shared by all decompositions
+_STREAM = None
 
-    nbz = len(reflections)
-    nk = int(modes["LA"].q_points.shape[0] / nbz)
-    nmodes = len(IN_PLANE_MODES) - len(exclude)
 
-    extracted_intensities = extract_scattering(time=time, q_points=modes["LA"].q_points)
+def shared_stream(q_points):
+    """
+    Scattering stream onto `q_points` shared by all decompositions in this process,
+    so that the dataset is opened only once. It is closed when the interpreter exits.
+    """
+    global _STREAM
+    if _STREAM is not None and not np.array_equal(_STREAM.q_points, q_points):
+        atexit.unregister(_STREAM.close)
+        _STREAM.close()
+        _STREAM = None
+    if _STREAM is None:
+        _STREAM = ScatteringStream(q_points=q_points)
+        atexit.register(_STREAM.close)
+    return _STREAM
 
-    intensities_list = np.split(extracted_intensities, indices_or_sections=nbz, axis=0)
 
-    # There is one system of equation per reduced wavevector k
-    # Therefore, axes 1 and 2 are along modes and reflections
-    # while axis 0 is along wavevectors
-    system = np.zeros(shape=(nk, nbz, nmodes), dtype=float)
-    intensities = np.zeros(shape=(nk, nbz), dtype=float)
+def _init_worker(q_points):
+    shared_stream(q_points)
 
-    for mode_index, mode_name in enumerate(mode_names):
 
-        mode = modes[mode_name]
-        F1j = np.abs(one_phonon_structure_factor(mode, dw_factors=Ms)) ** 2
-        weights = F1j / mode.frequencies.reshape((-1, 1))
+def _decompose(time):
+    """Decompose a single time-point in a worker process"""
+    return decomposition(frozenset(EXCLUDES[round(time, 3)])).solve(_STREAM(time))
 
-        # Perform smoothing
-        # this is very expensive...
-        weights = gaussian_table(mode.q_points, weights, sigma=5)
 
-        # Split quantities row-wise such that every quantity
-        # is related to a single reflection
-        weights_list = np.split(weights, indices_or_sections=nbz, axis=0)
+def decompose_all(times, q_points, pool=None):
+    """
+    Decompose all time-points, in order.
 
-        for refl_index, _ in enumerate(reflections):
-            system[:, refl_index, mode_index] = np.squeeze(weights_list[refl_index])
-            intensities[:, refl_index] = np.squeeze(intensities_list[refl_index])
+    Parameters
+    ----------
+    times : iterable of float
+        Time-delays [ps].
+    q_points : ndarray, shape (N, 3)
+        Q-points shared by all decompositions.
+    pool : multiprocessing.Pool or None, optional
+        Pool of worker processes, initialized with `_init_worker`, across which
+        time-points are distributed. Results are always yielded in the order of `times`.
+
+    Yields
+    ------
+    pop : dict[str, ndarray]
+        Population changes for each in-plane mode, for each time-point.
+    """
+    if pool is not None:
+        yield from pool.imap(_decompose, times)
+        return
 
-    pop, _ = optimize(system, intensities)
+    for time, intensities in shared_stream(q_points).stream(times):
+        yield decomposition(frozenset(EXCLUDES[round(time, 3)])).solve(intensities)
 
-    result = dict()
-    for index, mode_name in enumerate(mode_names):
-        result[mode_name] = pop[:, index]
 
-    return result
+def compression_options(compression, level):
+    """Keyword arguments to h5py.File.create_dataset for a compression filter"""
+    if compression == "none":
+        return dict()
+    if compression == "gzip":
+        return dict(shuffle=True, compression="gzip", compression_opts=level)
+    return dict(shuffle=True, compression=compression)
+
+
+parser = argparse.ArgumentParser(
+    description="Decompose diffraction patterns into mode populations and store them."
+)
+parser.add_argument(
+    "--processes",
+    type=int,
+    default=1,
+    help="Number of processes across which time-points are decomposed.",
+)
+parser.add_argument(
+    "--compression",
+    choices=["gzip", "lzf", "none"],
+    default="gzip",
+    help="Compression filter of the output datasets.",
+)
+parser.add_argument(
+    "--compression-level",
+    type=int,
+    default=9,
+    help="Compression level, if the compression filter is gzip.",
+)
 
 
 if __name__ == "__main__":
+    arguments = parser.parse_args()
 
     with DiffractionDataset(
         INPUT / "graphite_time_corrected_iris5.hdf5", mode="r"
@@ -255,21 +668,47 @@ if __name__ == "__main__":
 
     kx, ky, _ = np.hsplit(kpoints, 3)
 
-    with h5.File(OUTPUT / "population_timeseries.hdf5", mode="w") as f:
+    # Decompositions are built before workers are started, so that they
+    # are inherited by workers where processes are forked.
+    decompositions = [
+        decomposition(exclude)
+        for exclude in {frozenset(EXCLUDES[round(time, 3)]) for time in times}
+    ]
+
+    # All decompositions share the same q-points, over all reflections.
+    # These are not `kpoints`, which are computed from the (0,0,0) reflection only.
+    q_points = (
+        decompositions[0].q_points if decompositions else decomposition().q_points
+    )
+
+    with contextlib.ExitStack() as stack:
+        # Workers are started before the output file is opened,
+        # so that they never inherit its handle.
+        pool = None
+        if arguments.processes > 1:
+            pool = stack.enter_context(
+                mp.Pool(
+                    arguments.processes, initializer=_init_worker, initargs=(q_points,)
+                )
+            )
+        f = stack.enter_context(
+            h5.File(OUTPUT / "population_timeseries.hdf5", mode="w")
+        )
         f.attrs["times"] = times
 
         f.create_dataset("kx", data=kx)
         f.create_dataset("ky", data=ky)
 
         for mode_name, mode in modes.items():
+            # Chunks are aligned with the writes of one time-point at a time
             f.create_dataset(
                 mode_name,
                 shape=(len(kx), len(times)),
                 dtype=float,
-                chunks=True,
-                shuffle=True,
-                compression="gzip",
-                compression_opts=9,
+                chunks=(len(kx), 1),
+                **compression_options(
+                    arguments.compression, arguments.compression_level
+                ),
             )
 
             f.create_dataset(
@@ -277,9 +716,11 @@ if __name__ == "__main__":
                 data=mode.frequencies,
             )
 
-        for time_index, time in enumerate(tqdm(times)):
-            pop = population(kx=kx, ky=ky, time=time, exclude=EXCLUDES[round(time, 3)])
-            for mode_name in tqdm(IN_PLANE_MODES):
+        # Results are written by this process only, in order
+        populations = decompose_all(times, q_points, pool=pool)
+        populations = tqdm(populations, total=len(times))
+        for time_index, pop in enumerate(populations):
+            for mode_name in IN_PLANE_MODES:
                 f[mode_name][:, time_index] = np.squeeze(
                     pop.get(mode_name, np.zeros_like(kx))
                 )
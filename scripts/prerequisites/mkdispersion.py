@@ -16,9 +16,10 @@ from mkoneph import (
     prepare_modes,
     render,
 )
-from scipy.interpolate import griddata
 from tqdm import tqdm
 
+from dissutils import Regridder
+
 INPUT = Path("data") / "graphite"
 OUTPUT_STATIC = INPUT / "static-dispersion"
 OUTPUT_STATIC.mkdir(exist_ok=True)
@@ -59,29 +60,33 @@ def mkpath(points, nsteps):
     return path, vertices
 
 
-def dispersion(mode_str, path, reflections):
-    """Calculate a dispersion curve."""
-    modes = prepare_modes(reflections=tuple(reflections))
-    mode = modes[mode_str]
-
-    # Interpolate values of the dispersion over the path
+def path_regridder(q_points, path):
+    """
+    Interpolation from `q_points` onto a path in reciprocal space. All modes are
+    defined on the same q-points; the triangulation is therefore only computed once.
+    """
     pathx, pathy, _ = np.hsplit(path, 3)
     pathx, pathy = np.squeeze(pathx), np.squeeze(pathy)
 
-    freq = np.squeeze(
-        griddata(
-            points=mode.q_points[:, 0:2],
-            values=mode.frequencies,
-            xi=(pathx, pathy),
-            method="linear",
-            fill_value=0.0,
-        )
+    return Regridder(
+        points=q_points[:, 0:2],
+        xi=(pathx, pathy),
+        method="linear",
+        fill_value=0.0,
     )
 
+
+def dispersion(mode_str, regridder, reflections):
+    """Calculate a dispersion curve, interpolated over a path by `regridder`."""
+    modes = prepare_modes(reflections=tuple(reflections))
+    mode = modes[mode_str]
+
+    freq = np.squeeze(regridder(mode.frequencies))
+
     return freq
 
 
-def weighted_dispersion(mode_sre, path, reflections):
+def weighted_dispersion(mode_str, regridder, reflections):
     """Calculate a dispersion curve weighted by the one-phonon structure factor"""
     modes = prepare_modes(reflections=tuple(reflections))
     Ms = debye_waller_factors(modes)
@@ -89,31 +94,10 @@ def weighted_dispersion(mode_sre, path, reflections):
 
     F1j = np.abs(one_phonon_structure_factor(mode, dw_factors=Ms)) ** 2
 
-    # Interpolate values of the dispersion over the path
-    pathx, pathy, _ = np.hsplit(path, 3)
-    pathx, pathy = np.squeeze(pathx), np.squeeze(pathy)
+    # The triangulation is shared between weights and frequencies
+    weight, freq = regridder(F1j, mode.frequencies)
 
-    weight = np.squeeze(
-        griddata(
-            points=mode.q_points[:, 0:2],
-            values=F1j,
-            xi=(pathx, pathy),
-            method="linear",
-            fill_value=0.0,
-        )
-    )
-
-    freq = np.squeeze(
-        griddata(
-            points=mode.q_points[:, 0:2],
-            values=mode.frequencies,
-            xi=(pathx, pathy),
-            method="linear",
-            fill_value=0.0,
-        )
-    )
-
-    return freq, weight
+    return np.squeeze(freq), np.squeeze(weight)
 
 
 if __name__ == "__main__":
@@ -138,13 +122,21 @@ if __name__ == "__main__":
 
     reflections = tuple([(0, 0, 0), (0, 1, 0), (-1, 1, 0)])
 
+    # One regridder per path, shared by all modes
+    q_points = prepare_modes(reflections=reflections)["LA"].q_points
+    static_regridder = path_regridder(q_points, path=q_path1)
+    weighted_regridder = path_regridder(
+        q_points, path=np.concatenate([q_path1, q_path2], axis=0)
+    )
+
     # Static dispersion
     for mode_str in tqdm(IN_PLANE_MODES):
-        f = dispersion(mode_str, path=q_path1, reflections=reflections)
+        f = dispersion(mode_str, regridder=static_regridder, reflections=reflections)
         np.save(OUTPUT_STATIC / f"{mode_str}.npy", f)
 
-        q_path = np.concatenate([q_path1, q_path2], axis=0)
-        f, w = weighted_dispersion(mode_str, path=q_path, reflections=reflections)
+        f, w = weighted_dispersion(
+            mode_str, regridder=weighted_regridder, reflections=reflections
+        )
         np.save(OUTPUT_WEIGHTED / f"{mode_str}_frequencies.npy", f)
         np.save(OUTPUT_WEIGHTED / f"{mode_str}_oneph.npy", w)
 
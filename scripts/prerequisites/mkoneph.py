@@ -2,11 +2,19 @@
 """
 Calculate the in-plane one-phonon structure factors for Graphite.
 
-The calculation of those is required for multiple plots. 
+The calculation of those is required for multiple plots.
 """
+
+import atexit
+import hashlib
+import itertools as it
 import json
 import multiprocessing as mp
-from functools import lru_cache, partial
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
 from math import isclose
 from os import cpu_count
 from pathlib import Path
@@ -17,15 +25,27 @@ from crystals import Crystal
 from crystals.affine import change_of_basis
 from crystals.parsers import PWSCFParser
 from scipy.constants import physical_constants
-from scipy.interpolate import griddata
+from scipy.spatial import cKDTree
 from skimage.filters import gaussian
 from skued import affe, detector_scattvectors
-from tqdm import tqdm
+
+from dissutils import Regridder, save_maps
 
 INPUT = Path("data") / "graphite"
 OUTPUT = INPUT / "oneph"
 OUTPUT.mkdir(exist_ok=True)
 
+# All one-phonon maps and their downsampled versions are stored in a single file
+ONEPH_MAPS = OUTPUT / "oneph.hdf5"
+
+# Expanded modes are cached on disk, keyed by the hash of their inputs.
+# Bump CACHE_VERSION whenever the way modes are prepared changes.
+CACHE = INPUT / "cache"
+CACHE_VERSION = 2
+
+PWSCF_OUTPUT = INPUT / "graphite.out"
+PHONONS = INPUT / "Gra-C_XDM_mode_grid_new2.json"
+
 # Mode ordering of graphite according to the file
 # Gra-C_XDM_mode_grid_new2.json
 MODE_ORDERING = {
@@ -45,7 +65,7 @@ MODE_ORDERING = {
 MODES = sorted(MODE_ORDERING.keys())
 IN_PLANE_MODES = sorted(set(MODE_ORDERING.keys()) - {"ZA", "ZO1", "ZO2", "ZO3"})
 
-NCORES = cpu_count() - 1
+NCORES = max(1, cpu_count() - 1)
 EPS = np.finfo(float).eps
 
 
@@ -57,87 +77,106 @@ def ncells(crystal):
     return int(side_length * side_length * depth / crystal.volume)
 
 
-def get_eigenvector_frequency(data):
-    eigenvector = []
-
-    for key in data:
-        eigenvectors = np.zeros((3, 1), dtype=np.complex128)
-        if key == "freq":
-            frequency = float(data[key])
-        else:
-            eigenvectors[0] = np.array(float(data[key][0]) + float(data[key][1]) * 1j)
-            eigenvectors[1] = np.array(float(data[key][2]) + float(data[key][3]) * 1j)
-            eigenvectors[2] = np.array(float(data[key][4]) + float(data[key][5]) * 1j)
-            eigenvector.append(eigenvectors)
-
-    return eigenvector, frequency
-
-
-def extract_info_ordered(fname, crystal, **kwargs):
+def read_phonons(fname):
     """
-    Extract the information from JSON file
+    Parse the phonon JSON file once, filling preallocated arrays directly.
 
     Returns
     -------
     q_points : ndarray, shape (N, 3)
+        q-points in units of 2pi/alat.
     frequencies: ndarray, shape (N, nmodes)
-    polarizations: ndarray, shape (N, nmodes, natoms, 3)
+        Frequencies [cm^-1].
+    polarizations: ndarray, shape (N, nmodes, natoms, 3), dtype complex
     """
-    # Reciprocal lattice vectors in units of 2pi/alat
-    # so that the output q-points are indeed in "fractional coordinates"
-    p = PWSCFParser(crystal.source)
-    transf = np.linalg.inv(np.array(p.reciprocal_vectors_alat()))
-
     with open(fname, mode="r") as f:
         modes = json.load(f)
 
     modes_op, modes_ac = modes["Optical"], modes["Acoustic"]
 
-    q_points = []
-    eig_vector = []
-    freq = []
+    # Acoustic and optical modes are stored at the same q-points,
+    # under the same keys.
+    keys = [(key, key2) for key in modes_op.keys() for key2 in modes_op[key].keys()]
+    nmodes = len(MODE_ORDERING)
+    natoms = len(modes_op[keys[0][0]][keys[0][1]]["3"]) - 1  # all keys except "freq"
+
+    q_points = np.empty(shape=(len(keys), 3), dtype=float)
+    frequencies = np.empty(shape=(len(keys), nmodes), dtype=float)
+    # Real and imaginary parts of polarizations are interleaved
+    # along the last axis, as they are in the file.
+    eigenvectors = np.empty(shape=(len(keys), nmodes, natoms, 6), dtype=float)
+
+    for index, (key, key2) in enumerate(keys):
+        q_points[index, :] = np.asarray(modes_op[key][key2]["q_point"][0:3], float)
+        for mode_index in range(nmodes):
+            # The first three modes are acoustic modes
+            table = modes_ac if mode_index < 3 else modes_op
+            data = table[key][key2][str(mode_index)]
+            frequencies[index, mode_index] = float(data["freq"])
+            eigenvectors[index, mode_index] = np.asarray(
+                [v[0:6] for k, v in data.items() if k != "freq"], dtype=float
+            )
 
-    for key in modes_op.keys():
+    polarizations = eigenvectors[..., 0::2] + 1j * eigenvectors[..., 1::2]
+    return q_points, frequencies, polarizations
 
-        for key2 in modes_op[key].keys():
 
-            q_pt = np.array(
-                [
-                    float(modes_op[key][key2]["q_point"][0]),
-                    float(modes_op[key][key2]["q_point"][1]),
-                    float(modes_op[key][key2]["q_point"][2]),
-                ]
+def load_phonons(fname):
+    """
+    Load the phonon information contained in the JSON file `fname`.
+
+    The first time the file is loaded, its content is converted into a binary
+    sidecar file (``.npz``) which is reused for as long as it is newer than the JSON file.
+    See `read_phonons` for a description of the returned arrays.
+    """
+    fname = Path(fname)
+    sidecar = fname.with_suffix(".npz")
+
+    if sidecar.exists() and (sidecar.stat().st_mtime >= fname.stat().st_mtime):
+        with np.load(sidecar) as archive:
+            return (
+                archive["q_points"],
+                archive["frequencies"],
+                archive["polarizations"],
             )
-            q_points.append(np.array(q_pt).dot(transf))
 
-            e_vec = []
-            frequencies = []
+    q_points, frequencies, polarizations = read_phonons(fname)
 
-            for i in range(3):
+    # The sidecar is written in a temporary location first, so that
+    # an interrupted run never leaves a truncated sidecar behind.
+    tmpname = sidecar.with_name(f".tmp-{sidecar.name}")
+    np.savez(
+        tmpname,
+        q_points=q_points,
+        frequencies=frequencies,
+        polarizations=polarizations,
+    )
+    os.replace(tmpname, sidecar)
+    return q_points, frequencies, polarizations
 
-                eigenvector, frequency = get_eigenvector_frequency(
-                    modes_ac[key][key2][str(i)]
-                )
-                e_vec.append(eigenvector)
-                frequencies.append(frequency)
 
-            for i in range(3, 12):
+def extract_info_ordered(fname, crystal, **kwargs):
+    """
+    Extract the information from JSON file
 
-                eigenvector, frequency = get_eigenvector_frequency(
-                    modes_op[key][key2][str(i)]
-                )
-                e_vec.append(eigenvector)
-                frequencies.append(np.array(frequency))
+    Returns
+    -------
+    q_points : ndarray, shape (N, 3)
+    frequencies: ndarray, shape (N, nmodes)
+    polarizations: ndarray, shape (N, nmodes, natoms, 3)
+    """
+    # Reciprocal lattice vectors in units of 2pi/alat
+    # so that the output q-points are indeed in "fractional coordinates"
+    p = PWSCFParser(crystal.source)
+    transf = np.linalg.inv(np.array(p.reciprocal_vectors_alat()))
 
-            eig_vector.append(e_vec)
-            freq.append(np.array(frequencies))
+    q_points, freq, eig_vector = load_phonons(fname)
 
-    q_points = np.asarray(q_points)
-    eig_vector = np.squeeze(np.asarray(eig_vector))
+    q_points = q_points @ transf
     speed_of_light_cm = (
         physical_constants["speed of light in vacuum"][0] * 100
     )  # in cm/s
-    freq = np.asarray(freq) * speed_of_light_cm  # frequencies in Hz
+    freq = freq * speed_of_light_cm  # frequencies in Hz
 
     # Certain acoustic modes may have slightly negative frequencies
     # We shift frequencies up so that the minimum is always 0
@@ -181,8 +220,54 @@ def unique_by_rows(*arrs):
     return tuple(arr[unique_row_indices] for arr in arrs)
 
 
-def roughly_unique_by_rows(*arrs, decimals, axis=0):
-    """Apply uniqueness rules on an array, based on lower precision."""
+def roughly_unique_idx(points, tol):
+    """
+    Return the indices of the rows in `points` which are unique, up to a distance `tol`.
+
+    Rows are visited in order, and a row is kept only if no row kept before it
+    is within a distance `tol`. Kept rows are therefore always further than
+    `tol` apart, and every row is within `tol` of a kept row. Contrary to rounding,
+    rows on either side of a rounding boundary are correctly identified as duplicates.
+
+    Parameters
+    ----------
+    points : ndarray, shape (N, D)
+        Table where every row is considered a vector.
+    tol : float
+        Distance below which rows are considered duplicates.
+
+    Returns
+    -------
+    indices : ndarray, shape (M,), dtype int
+        Ascending indices of the unique rows.
+    """
+    tree = cKDTree(points)
+    duplicate = np.zeros(shape=(points.shape[0],), dtype=bool)
+    indices = list()
+    for index, point in enumerate(points):
+        if duplicate[index]:
+            continue
+        indices.append(index)
+        duplicate[tree.query_ball_point(point, r=tol)] = True
+    return np.asarray(indices, dtype=int)
+
+
+def roughly_unique_by_rows(*arrs, decimals=None, tol=None, axis=0):
+    """
+    Apply uniqueness rules on an array, based on lower precision.
+
+    Exactly one of `decimals` or `tol` must be provided. If `tol` is provided, rows
+    of the first array closer than `tol` to each other are considered duplicates
+    (see `roughly_unique_idx`). Otherwise, rows are compared after rounding
+    to `decimals`, and the first array is returned rounded.
+    """
+    if (decimals is None) == (tol is None):
+        raise ValueError("Exactly one of `decimals` or `tol` must be provided.")
+
+    if tol is not None:
+        indices = roughly_unique_idx(arrs[0], tol=tol)
+        return tuple(arr[indices] for arr in arrs)
+
     rough = np.copy(arrs[0])
     np.around(rough, decimals=decimals, out=rough)
     return unique_by_rows(rough, *arrs[1:])
@@ -213,19 +298,23 @@ def is_in_plane(transformation):
     return True
 
 
-def apply_symops(kpoints, polarizations, crystal, symprec=1e-1):
+def symmetry_rotations(crystal, symprec=1e-1):
     """
-    Apply symmetry operations to polarizations vectors and q-points
+    In-plane symmetry rotations of a crystal, stacked along the first axis.
 
-    kpoints : ndarray, shape (N,3)
-        Scattering vector within one Brillouin zone
-    polarizations : ndarray, shape (N, natoms, 3)
-        Complex polarization vectors. Every row is associated with the corresponding row
-        in `kpoints`.
+    Parameters
+    ----------
     crystal: crystals.Crystal
         Crystal object with the appropriate symmetry.
     symprec : float, optional
         Symmetry-determination precision.
+
+    Returns
+    -------
+    k_rotations : ndarray, shape (nops, 3, 3)
+        Rotation matrices acting on fractional reciprocal-space coordinates.
+    p_rotations : ndarray, shape (nops, 3, 3)
+        Rotation matrices acting on cartesian polarization vectors.
     """
     # Change of basis matrices allow to express
     # transformations in other bases
@@ -233,31 +322,83 @@ def apply_symops(kpoints, polarizations, crystal, symprec=1e-1):
         np.array(crystal.lattice_vectors), np.array(crystal.reciprocal_vectors)
     )
     from_reciprocal = np.linalg.inv(to_reciprocal)
-    reciprocal = lambda m: to_reciprocal @ m @ from_reciprocal
 
     to_frac = change_of_basis(np.eye(3), np.array(crystal.lattice_vectors))
     from_frac = np.linalg.inv(to_frac)
-    cartesian = lambda m: from_frac @ m @ to_frac
-
-    transformed_k, transformed_p = list(), list()
 
     transformations = crystal.symmetry_operations(symprec=symprec)
-    in_plane_transformations = list(filter(is_in_plane, transformations))
-    for transf in in_plane_transformations:
-        rotation = transf[0:3, 0:3]
-        transformed_k.append(mapply(reciprocal(rotation), kpoints))
-
-        # Transforming polarizations is a little more complex
-        # because of the extra dimension.
-        newpols = np.copy(polarizations)
-        for atm_index in range(len(crystal)):
-            newpols[:, atm_index, :] = mapply(
-                cartesian(rotation), polarizations[:, atm_index, :]
-            )
+    rotations = np.stack(
+        [transf[0:3, 0:3] for transf in filter(is_in_plane, transformations)]
+    )
+    return (
+        to_reciprocal @ rotations @ from_reciprocal,
+        from_frac @ rotations @ to_frac,
+    )
+
+
+def rotate_table(kpoints, polarizations, k_rotations, p_rotations, out=None):
+    """
+    Apply stacked rotations to k-points and polarizations, all at once.
+
+    The output is ordered such that every block of N rows is associated
+    with one rotation.
+
+    Parameters
+    ----------
+    kpoints : ndarray, shape (N,3)
+        Scattering vector within one Brillouin zone
+    polarizations : ndarray, shape (N, natoms, 3)
+        Complex polarization vectors.
+    k_rotations, p_rotations : ndarray, shape (nops, 3, 3)
+        Rotations matrices for k-points and polarizations, e.g. from `symmetry_rotations`.
+    out : 2-tuple of ndarrays, optional
+        C-contiguous arrays of shape (nops * N, 3) and (nops * N, natoms, 3) in
+        which to place the results, e.g. memory-mapped arrays.
+
+    Returns
+    -------
+    kpoints : ndarray, shape (nops * N, 3)
+    polarizations : ndarray, shape (nops * N, natoms, 3)
+    """
+    nops, nk = k_rotations.shape[0], kpoints.shape[0]
+    if out is None:
+        out = (
+            np.empty(shape=(nops * nk, 3), dtype=np.result_type(kpoints, float)),
+            np.empty(
+                shape=(nops * nk,) + polarizations.shape[1:],
+                dtype=np.result_type(polarizations, float),
+            ),
+        )
+    out_k, out_p = out
+
+    np.einsum("oij,nj->oni", k_rotations, kpoints, out=out_k.reshape((nops, nk, 3)))
+    # Transforming polarizations is a little more complex
+    # because of the extra dimension.
+    np.einsum(
+        "oij,naj->onai",
+        p_rotations,
+        polarizations,
+        out=out_p.reshape((nops,) + polarizations.shape),
+    )
+    return out_k, out_p
 
-        transformed_p.append(newpols)
 
-    return np.vstack(transformed_k), np.vstack(transformed_p)
+def apply_symops(kpoints, polarizations, crystal, symprec=1e-1):
+    """
+    Apply symmetry operations to polarizations vectors and q-points
+
+    kpoints : ndarray, shape (N,3)
+        Scattering vector within one Brillouin zone
+    polarizations : ndarray, shape (N, natoms, 3)
+        Complex polarization vectors. Every row is associated with the corresponding row
+        in `kpoints`.
+    crystal: crystals.Crystal
+        Crystal object with the appropriate symmetry.
+    symprec : float, optional
+        Symmetry-determination precision.
+    """
+    k_rotations, p_rotations = symmetry_rotations(crystal, symprec=symprec)
+    return rotate_table(kpoints, polarizations, k_rotations, p_rotations)
 
 
 class Mode:
@@ -289,6 +430,22 @@ class Mode:
         self.crystal = crystal
         self.hkls = hkls
 
+    def __len__(self):
+        return self.q_points.shape[0]
+
+    def chunks(self):
+        """
+        Iterate over chunks of mode information.
+
+        Yields
+        ------
+        rows : slice
+            Rows of the full mode arrays covered by the chunk.
+        chunk : Mode
+            Mode information in this chunk.
+        """
+        yield slice(0, len(self)), self
+
     def save(self, fname):
         """Save all mode information"""
         np.savez(
@@ -321,6 +478,128 @@ class Mode:
         )
 
 
+class ExtendedMode:
+    """
+    Mode information replicated over multiple Brillouin zones, stored lazily.
+
+    Only the information within a single Brillouin zone is stored, along with the
+    reflections over which it is replicated. Full arrays (e.g. `q_points`) are computed
+    on demand, ordered by Brillouin zone; `chunks` iterates over one Brillouin zone at a time
+    without materializing full arrays.
+
+    Parameters
+    ----------
+    name : str
+        Mode name, e.g. "LA".
+    k_points : ndarray, shape (N, 3)
+        Table of reciprocal space vectors where the mode is defined, within
+        the (000) Brillouin zone [1/A].
+    frequencies : ndarray, shape (N,)
+        Mode frequencies at every point in ``k_points`` [Hz]
+    polarizations : ndarray, shape (N, natoms, 3), dtype complex
+        Complex mode polarization PER ATOM.
+    crystal : crystals.Crystal instance
+    reflections : ndarray, shape (nzones, 3)
+        Miller indices of the Brillouin zones over which the mode is replicated.
+    """
+
+    def __init__(
+        self, name, k_points, frequencies, polarizations, crystal, reflections
+    ):
+        self.name = name
+        self.zone_k_points = k_points
+        self.zone_frequencies = frequencies
+        self.zone_polarizations = polarizations
+        self.crystal = crystal
+        self.reflections = np.asarray(reflections).reshape((-1, 3))
+
+    def __len__(self):
+        return self.nzones * self.zone_k_points.shape[0]
+
+    @property
+    def nzones(self):
+        """Number of Brillouin zones over which the mode is defined."""
+        return self.reflections.shape[0]
+
+    def bragg_vectors(self):
+        """Scattering vectors of the reflections [1/A], shape (nzones, 3)"""
+        return self.reflections @ np.array(self.crystal.reciprocal_vectors)
+
+    @property
+    def q_points(self):
+        """Table of all reciprocal space vectors, shape (len(self), 3)"""
+        q_points = self.zone_k_points[None, :, :] + self.bragg_vectors()[:, None, :]
+        return q_points.reshape((-1, 3))
+
+    @property
+    def hkls(self):
+        """Nearest Bragg-peak associated with each row of `q_points`."""
+        npoints = self.zone_k_points.shape[0]
+        return np.repeat(self.reflections.astype(float), npoints, axis=0)
+
+    @property
+    def frequencies(self):
+        """Mode frequencies at every row of `q_points`"""
+        return np.tile(self.zone_frequencies, reps=self.nzones)
+
+    @property
+    def polarizations(self):
+        """Polarizations at every row of `q_points`. This is very memory-intensive."""
+        return np.tile(self.zone_polarizations, reps=(self.nzones, 1, 1))
+
+    def chunks(self):
+        """
+        Iterate over mode information, one Brillouin zone at a time.
+        Polarizations and frequencies of every chunk are views on the single-zone arrays.
+
+        Yields
+        ------
+        rows : slice
+            Rows of the full mode arrays covered by the Brillouin zone.
+        chunk : Mode
+            Mode information in this Brillouin zone.
+        """
+        npoints = self.zone_k_points.shape[0]
+        bragg_vectors = self.bragg_vectors()
+        for index, (hkl, bragg) in enumerate(zip(self.reflections, bragg_vectors)):
+            rows = slice(index * npoints, (index + 1) * npoints)
+            yield rows, Mode(
+                name=self.name,
+                q_points=self.zone_k_points + bragg[None, :],
+                frequencies=self.zone_frequencies,
+                polarizations=self.zone_polarizations,
+                crystal=self.crystal,
+                hkls=np.broadcast_to(hkl.astype(float), self.zone_k_points.shape),
+            )
+
+    def save(self, fname):
+        """Save all mode information"""
+        np.savez(
+            fname,
+            k_points=self.zone_k_points,
+            frequencies=self.zone_frequencies,
+            polarizations=self.zone_polarizations,
+            reflections=self.reflections,
+        )
+
+    def k_points(self):
+        """Determine the unique k-points in this mode."""
+        return np.tile(self.zone_k_points, reps=(self.nzones, 1))
+
+    def filter_gamma(self, radius):
+        """Filter information so that k-points near Gamma are removed."""
+        not_near_gamma = np.greater(np.linalg.norm(self.zone_k_points, axis=1), radius)
+
+        return ExtendedMode(
+            name=self.name,
+            k_points=self.zone_k_points[not_near_gamma],
+            frequencies=self.zone_frequencies[not_near_gamma],
+            polarizations=self.zone_polarizations[not_near_gamma],
+            crystal=self.crystal,
+            reflections=self.reflections,
+        )
+
+
 def remove_by_rows(remove, *arrs):
     """
     Filter arrays where rows in `remove` are True are removed.
@@ -376,42 +655,27 @@ def extend_bragg(mode, reflections):
     Expand mode information so that it covers the entire detector range.
 
     The input is assumed to be a Mode representing information in a single Brillouin zone (000).
-    Symmetry operations are applied, as well as some filtering.
+    The information is not copied over all reflections; rather, an `ExtendedMode`
+    is returned.
     """
-    q_points = mode.q_points
-    polarizations = mode.polarizations
-    frequencies = mode.frequencies
-
-    over_reflections, hkls = list(), list()
-    astar, bstar, cstar = mode.crystal.reciprocal_vectors
-    for (h, k, l) in reflections:
-        H = h * astar + k * bstar + l * cstar
-        over_reflections.append(q_points + H[None, :])
-
-        # Quick way to copy a chunk of h, k, l row-wise
-        hkls.append(np.zeros_like(q_points) + np.array([h, k, l], dtype=int)[None, :])
-
-    # Important to distinguish
-    q_points = np.vstack(over_reflections)
-    hkls = np.vstack(hkls)
-    q_points, polarizations, frequencies, hkls = tile_over_rows(
-        q_points, polarizations, frequencies, hkls
-    )
-
-    return Mode(
+    return ExtendedMode(
         name=mode.name,
-        q_points=q_points,
-        frequencies=frequencies,
-        polarizations=polarizations,
+        k_points=mode.q_points,
+        frequencies=mode.frequencies,
+        polarizations=mode.polarizations,
         crystal=mode.crystal,
-        hkls=hkls,
+        reflections=np.array(reflections, dtype=int),
     )
 
 
-def decimate(mode, decimals=2):
+def decimate(mode, decimals=2, tol=None):
     """
     Decimate the information contained in modes based on similarity
     i.e. q-points that are roughly the same will be purged.
+
+    If `tol` is provided, q-points within a distance `tol` [1/A] of each other
+    are considered the same, and `decimals` is ignored. Otherwise, q-points are
+    compared after rounding to `decimals`.
     """
     # Filter qs to a slightly lower precision
     # Because of QE rounding error + symmetry operations,
@@ -421,7 +685,8 @@ def decimate(mode, decimals=2):
         mode.polarizations,
         mode.frequencies,
         mode.hkls,
-        decimals=decimals,
+        decimals=decimals if tol is None else None,
+        tol=tol,
     )
 
     return Mode(
@@ -434,10 +699,105 @@ def decimate(mode, decimals=2):
     )
 
 
-def prepare_modes(reflections, decimate=3):
+def _hash_file(hasher, fname):
+    """Update `hasher` with the content of the file `fname`, block by block."""
+    with open(fname, mode="rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            hasher.update(block)
+
+
+def modes_cache_key(reflections, decimate):
+    """
+    Content hash which identifies the result of `prepare_modes`.
+
+    The key depends on the PWSCF output and phonon files, the reflections,
+    and the decimation factor.
+    """
+    # Reflections may contain numpy integers, whose repr is
+    # not stable across numpy versions.
+    reflections = tuple(tuple(int(i) for i in refl) for refl in reflections)
+
+    hasher = hashlib.sha256()
+    for fname in (PWSCF_OUTPUT, PHONONS):
+        _hash_file(hasher, fname)
+    hasher.update(repr((CACHE_VERSION, reflections, int(decimate))).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+@contextmanager
+def atomic_directory(path):
+    """
+    Context manager yielding a temporary directory, which is moved to `path`
+    on success. This way, readers never see a partially-written directory.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmpdir = Path(tempfile.mkdtemp(dir=path.parent, prefix=".tmp-"))
+    try:
+        yield tmpdir
+        os.replace(tmpdir, path)
+    except OSError:
+        # Another process might have populated the directory in the meantime.
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        if not path.exists():
+            raise
+    except BaseException:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+
+
+def save_modes(modes, path):
+    """
+    Save extended modes in a directory, one ``.npy`` file per array so that
+    they can be memory-mapped when loaded again with `load_modes`.
+
+    The directory is first written in a temporary location, and then moved
+    into place, so that readers never see a partially-written cache.
+    """
+    with atomic_directory(path) as tmpdir:
+        for name, mode in modes.items():
+            np.save(tmpdir / f"{name}_k_points.npy", mode.zone_k_points)
+            np.save(tmpdir / f"{name}_frequencies.npy", mode.zone_frequencies)
+            np.save(tmpdir / f"{name}_polarizations.npy", mode.zone_polarizations)
+            np.save(tmpdir / f"{name}_reflections.npy", mode.reflections)
+
+
+def load_modes(path, crystal, mmap_mode="r"):
+    """
+    Load modes saved with `save_modes`. By default, arrays are memory-mapped
+    in read-only mode.
+
+    Returns
+    -------
+    modes : dict[str, ExtendedMode]
+    """
+    path = Path(path)
+    names = sorted(fname.name.split("_")[0] for fname in path.glob("*_k_points.npy"))
+
+    def load(name, attr):
+        return np.load(path / f"{name}_{attr}.npy", mmap_mode=mmap_mode)
+
+    return {
+        name: ExtendedMode(
+            name=name,
+            k_points=load(name, "k_points"),
+            frequencies=load(name, "frequencies"),
+            polarizations=load(name, "polarizations"),
+            crystal=crystal,
+            reflections=load(name, "reflections"),
+        )
+        for name in names
+    }
+
+
+def prepare_modes(reflections, decimate=3, cache=True):
     """
     Prepare all modes for further calculations. Caching included.
 
+    Results are cached in memory, as well as on disk in the `CACHE` directory.
+    The on-disk cache is keyed by the content of input files, so that it is
+    invalidated when the inputs change.
+
     Parameters
     ----------
     reflections : iterable of 3-tuples
@@ -447,21 +807,62 @@ def prepare_modes(reflections, decimate=3):
         lower the number of q-points considered in the calculations.
     temperatures : dict[str, float] or None, optional
         Mode temperatures [K], e.g. {"LA": 100}. Default value is room temperature.
+    cache : bool, optional
+        If False, the on-disk cache is neither read nor written.
 
     Returns
     -------
-    modes : dict[str, Mode]
+    modes : dict[str, ExtendedMode]
     """
-    return _prepare_modes(reflections=tuple(reflections), decimate=int(decimate))
+    return _prepare_modes(
+        reflections=tuple(reflections), decimate=int(decimate), cache=bool(cache)
+    )
 
 
 @lru_cache(maxsize=16)
-def _prepare_modes(reflections, decimate=3):
-    cryst = Crystal.from_pwscf(INPUT / "graphite.out")
+def _prepare_modes(reflections, decimate=3, cache=True):
+    cryst = Crystal.from_pwscf(PWSCF_OUTPUT)
 
-    k_points, frequencies, polarizations = extract_info_ordered(
-        INPUT / "Gra-C_XDM_mode_grid_new2.json", crystal=cryst
-    )
+    if not cache:
+        # Arrays are read in memory, so that the temporary files can be removed
+        with tempfile.TemporaryDirectory() as tmpdir:
+            _compute_modes(cryst, reflections, decimate, directory=tmpdir)
+            return load_modes(tmpdir, crystal=cryst, mmap_mode=None)
+
+    # Memory-mapped arrays are returned, so that the in-memory
+    # footprint is the same whether or not the cache was hit.
+    cache_path = CACHE / modes_cache_key(reflections, decimate)
+    if not cache_path.exists():
+        with atomic_directory(cache_path) as tmpdir:
+            _compute_modes(cryst, reflections, decimate, directory=tmpdir)
+    return load_modes(cache_path, crystal=cryst)
+
+
+def worker_pool(processes=None):
+    """
+    Pool of `processes` worker processes (default: NCORES), created once
+    and re-used across calculations. It is terminated when the interpreter exits.
+    """
+    return _worker_pool(NCORES if processes is None else processes)
+
+
+@lru_cache(maxsize=None)
+def _worker_pool(processes):
+    pool = mp.Pool(processes)
+    atexit.register(pool.terminate)
+    return pool
+
+
+def _compute_modes(cryst, reflections, decimate, directory):
+    """
+    Compute all expanded modes from scratch, and save them in `directory`
+    in the format of `save_modes`. See `prepare_modes`.
+
+    Symmetrization is done in parallel. Arrays are exchanged with the workers
+    through memory-mapped files, so that they are never serialized.
+    """
+    directory = Path(directory)
+    k_points, frequencies, polarizations = extract_info_ordered(PHONONS, crystal=cryst)
 
     # NOTE
     # Optimization trick is to skip over a few k-points
@@ -471,26 +872,70 @@ def _prepare_modes(reflections, decimate=3):
     frequencies = frequencies[0::decimate, :]
     polarizations = polarizations[0::decimate, :]
 
+    # Symmetry rotations are expressed such that k-points are
+    # transformed from fractional coordinates to inverse angstroms
+    k_rotations, p_rotations = symmetry_rotations(cryst)
+    from_fractional = np.linalg.inv(
+        change_of_basis(np.eye(3), np.array(cryst.reciprocal_vectors))
+    )
+    k_rotations = from_fractional @ k_rotations
+    nops = k_rotations.shape[0]
+
+    inputs = directory / "unsymmetrized"
+    inputs.mkdir()
+    np.save(inputs / "k_points.npy", k_points)
+    np.save(inputs / "polarizations.npy", polarizations)
+
     # Int -> Str for in-plane modes
     names = {v: k for k, v in MODE_ORDERING.items()}
-    modes = [
-        Mode(
-            name=names[mode_index],
-            q_points=k_points,
-            frequencies=frequencies[:, mode_index],
-            polarizations=polarizations[:, mode_index, :, :],
-            crystal=cryst,
-        )
+    tasks = [
+        (directory, names[mode_index], mode_index, k_rotations, p_rotations)
         for mode_index in range(frequencies.shape[1])
     ]
 
-    with mp.Pool(NCORES) as pool:
-        symmetrized_modes = pool.map(symmetrize, modes)
-        extended_modes = pool.map(
-            partial(extend_bragg, reflections=reflections), symmetrized_modes
+    try:
+        worker_pool().starmap(_symmetrize_into, tasks)
+    finally:
+        shutil.rmtree(inputs)
+
+    for mode_index in range(frequencies.shape[1]):
+        name = names[mode_index]
+        np.save(
+            directory / f"{name}_frequencies.npy",
+            np.tile(frequencies[:, mode_index], reps=nops),
         )
+        np.save(directory / f"{name}_reflections.npy", np.array(reflections, dtype=int))
 
-    return {mode.name: mode for mode in extended_modes}
+
+def _symmetrize_into(directory, name, mode_index, k_rotations, p_rotations):
+    """
+    Symmetrize the mode `name`, reading unsymmetrized arrays from `directory`
+    and writing the results in `directory` as memory-mapped files.
+    See `_compute_modes`.
+    """
+    k_points = np.load(directory / "unsymmetrized" / "k_points.npy", mmap_mode="r")
+    polarizations = np.load(
+        directory / "unsymmetrized" / "polarizations.npy", mmap_mode="r"
+    )[:, mode_index, :, :]
+
+    nrows = k_rotations.shape[0] * k_points.shape[0]
+    out = (
+        np.lib.format.open_memmap(
+            directory / f"{name}_k_points.npy",
+            mode="w+",
+            dtype=np.result_type(k_points, float),
+            shape=(nrows, 3),
+        ),
+        np.lib.format.open_memmap(
+            directory / f"{name}_polarizations.npy",
+            mode="w+",
+            dtype=np.result_type(polarizations, float),
+            shape=(nrows,) + polarizations.shape[1:],
+        ),
+    )
+    rotate_table(k_points, polarizations, k_rotations, p_rotations, out=out)
+    for arr in out:
+        arr.flush()
 
 
 def phonon_amplitude(frequencies, temperature):
@@ -519,31 +964,39 @@ def phonon_amplitude(frequencies, temperature):
     return (hbar / frequencies) * coth(hbar * frequencies / (2 * kB * temperature))
 
 
+def _zone_information(mode):
+    """
+    Frequencies and polarizations of a mode, and the number of Brillouin zones
+    that they cover.
+    """
+    # The sum happens for all q's, but the polarization vectors of a single
+    # Brillouin zone. This is annoying to keep track of. Extended modes store
+    # information for a single Brillouin zone, so that we can sum over it directly.
+    # Otherwise, since polarization vectors are the same across different
+    # Brillouin zones, we sum over all zones. This leads to "double" counting,
+    # hence a correction factor based on the number of Brilluoin zones `nzones`.
+    if isinstance(mode, ExtendedMode):
+        return mode.zone_frequencies, mode.zone_polarizations, 1
+    hkls, *_ = unique_by_rows(mode.hkls)
+    return mode.frequencies, mode.polarizations, hkls.shape[0]
+
+
 def _debye_waller_factor(modes, temperatures, atm_index):
     """Calculate a Debye-Waller factor for one atom."""
     # This calculation assumes that the Debye-Waller factor is isotropic
     # i.e. it only depends on the magnitude of q and polarizations ek
-    # The anisotropic factor is much more computationally expensive
+    # See `_displacement_tensors` for the anisotropic factor
     n = ncells(modes["LA"].crystal)
 
-    # The sum happens for all q's, but the polarization vectors of a single
-    # Brillouin zone. This is annoying to keep track of. Since polarization
-    # vectors are the same across different Brillouin zones, we sum over all
-    # zones. This leads to "double" counting, hence a correction factor based
-    # on the number of Brilluoin zones `nzones`.
-    hkls, *_ = unique_by_rows(modes["LA"].hkls)
-    nzones = hkls.shape[0]
-
     def accumulator(mode):
         # This is the sum over k
-        # Really, it is a sum over all q, and it will be corrected
-        # in the parent function.
         temp = temperatures[mode.name]
+        frequencies, polarizations, nzones = _zone_information(mode)
         return (
             np.sum(
                 (1 / n)
-                * phonon_amplitude(mode.frequencies, temp)
-                * np.linalg.norm(mode.polarizations[:, atm_index, :], axis=1) ** 2
+                * phonon_amplitude(frequencies, temp)
+                * np.linalg.norm(polarizations[:, atm_index, :], axis=1) ** 2
             )
             / nzones
         )
@@ -552,19 +1005,51 @@ def _debye_waller_factor(modes, temperatures, atm_index):
     return ns.sum(accumulator(m) for m in modes.values())
 
 
-def debye_waller_factors(modes, temperatures=None):
+def _displacement_tensors(modes, temperatures):
+    """
+    Calculate the mean-square-displacement tensor of every atom, i.e.
+    the sum over modes and k-points of a_{jk}^2 e_{s,jk} e_{s,jk}^*,
+    which determines the anisotropic Debye-Waller factor.
+
+    Returns
+    -------
+    tensors : ndarray, shape (natoms, 3, 3)
+    """
+    n = ncells(modes["LA"].crystal)
+
+    amplitudes, polarizations = list(), list()
+    for mode in modes.values():
+        frequencies, pols, nzones = _zone_information(mode)
+        amplitudes.append(
+            phonon_amplitude(frequencies, temperatures[mode.name]) / (n * nzones)
+        )
+        polarizations.append(pols)
+    amplitudes = np.stack(amplitudes, axis=0)  # shape (nmodes, N)
+    polarizations = np.stack(polarizations, axis=0)  # shape (nmodes, N, natoms, 3)
+
+    # Sum over modes (m) and k-points (k) in a single contraction.
+    # Since q-vectors are real, only the real part of the tensor contributes.
+    return np.einsum(
+        "mk,mksa,mksb->sab", amplitudes, polarizations, np.conj(polarizations)
+    ).real
+
+
+def debye_waller_factors(modes, temperatures=None, anisotropic=False):
     """
     Compute the debye-waller factor based on all mode information.
     These modes are assumed to have been expanded, i.e. represent mode information
     over the entire detector range.
 
-    For performance reasons, we consider the isotropic Debye-Waller effect.
+    By default, we consider the isotropic Debye-Waller effect.
 
     Parameters
     ----------
-    modes : dict[str, Mode]
+    modes : dict[str, Mode] or dict[str, ExtendedMode]
     temperatures : dict[str, float] or None, optional
         Mode temperatures [K]. Defaults to room temperature.
+    anisotropic : bool, optional
+        If True, the anisotropic Debye-Waller factor is computed. The mean-square
+        displacement tensor of every atom is computed once, and then applied to all q-points.
 
     Returns
     -------
@@ -583,7 +1068,17 @@ def debye_waller_factors(modes, temperatures=None):
     # We loop through atoms in order that they are visible in the PWSCF file
     # That's the tag properties on Atom objects
     atoms = sorted(modes["LA"].crystal, key=lambda a: a.tag)
-    q2 = np.linalg.norm(modes["LA"].q_points, axis=1) ** 2
+    q_points = modes["LA"].q_points
+
+    if anisotropic:
+        tensors = _displacement_tensors(modes, temperatures)
+        return [
+            np.einsum("na,ab,nb->n", q_points, tensors[index], q_points)
+            / (4 * atom.mass * amu_to_kg)
+            for index, atom in enumerate(atoms)
+        ]
+
+    q2 = np.linalg.norm(q_points, axis=1) ** 2
     prefactor = lambda atm: q2 / (12 * atm.mass * amu_to_kg)
 
     # Parallelizing this calculation is actually slower
@@ -595,57 +1090,160 @@ def debye_waller_factors(modes, temperatures=None):
     ]
 
 
+def one_phonon_structure_factors(
+    q_points, polarizations, crystal, dw_factors, chunksize=2**16, out=None
+):
+    """
+    Compute the one-phonon structure factors of multiple modes at once.
+
+    Atomic form factors and Debye-Waller exponentials are computed once per q-point,
+    and shared between modes. The calculation is done in chunks of q-points,
+    written in-place in `out`, so that peak memory usage is bounded.
+
+    Parameters
+    ----------
+    q_points : ndarray, shape (N, 3)
+        Scattering vectors, shared by all modes.
+    polarizations : ndarray or sequence of ndarrays, shape (nmodes, N, natoms, 3)
+        Complex polarizations of every mode. A sequence of arrays, one per mode,
+        avoids stacking all polarizations in memory at once.
+    crystal : crystals.Crystal
+    dw_factors : iterable of ndarray, shapes (N,)
+        Debye-Waller factors, at every q-point, for each atom in the unit cell.
+    chunksize : int, optional
+        Number of q-points processed at once.
+    out : ndarray, shape (nmodes, N), dtype complex, optional
+        Array in which to store the results.
+
+    Returns
+    -------
+    oneph: ndarray, shape (nmodes, N), dtype complex
+        One-phonon structure factor for every mode.
+    """
+    nmodes, npoints = len(polarizations), q_points.shape[0]
+    if out is None:
+        out = np.empty(shape=(nmodes, npoints), dtype=complex)
+    assert out.shape == (nmodes, npoints)
+    assert dw_factors[0].shape == (npoints,)
+
+    # We loop through atoms in order that they are visible in the PWSCF file
+    atoms = sorted(crystal, key=lambda a: a.tag)
+    for start in range(0, npoints, chunksize):
+        chunk = slice(start, min(start + chunksize, npoints))
+        qpoints = q_points[chunk]
+        q_norm = np.linalg.norm(qpoints, axis=1)
+        pols = np.stack([p[chunk] for p in polarizations], axis=0)
+
+        # Weight of each atom, shared by all modes
+        weights = np.empty(shape=(len(atoms), qpoints.shape[0]), dtype=float)
+        for atm_index, atm in enumerate(atoms):
+            weights[atm_index] = np.exp(-1 * dw_factors[atm_index][chunk])
+            weights[atm_index] *= affe(atm, q_norm) / np.sqrt(atm.mass)
+
+        np.einsum("nd,mnad,an->mn", qpoints, pols, weights, out=out[:, chunk])
+        out[:, chunk] = np.nan_to_num(out[:, chunk])
+
+    return out
+
+
+def mode_structure_factors(modes, dw_factors):
+    """
+    Compute the one-phonon structure factors of multiple modes defined on the
+    same q-points. Modes are processed one chunk at a time (e.g. one Brillouin zone
+    at a time for `ExtendedMode`), so that full polarization arrays are never built.
+
+    Parameters
+    ----------
+    modes : iterable of Mode or ExtendedMode
+        Modes defined at the same `N` q-points.
+    dw_factors : iterable of ndarray, shapes (N,)
+        Debye-Waller factors, at every q-point, for each atom in the unit cell.
+
+    Returns
+    -------
+    oneph: ndarray, shape (nmodes, N), dtype complex
+        One-phonon structure factor for every mode.
+    """
+    modes = list(modes)
+    out = np.empty(shape=(len(modes), len(modes[0])), dtype=complex)
+    for chunks in zip(*(mode.chunks() for mode in modes)):
+        rows, first = chunks[0]
+        one_phonon_structure_factors(
+            q_points=first.q_points,
+            polarizations=[chunk.polarizations for _, chunk in chunks],
+            crystal=first.crystal,
+            dw_factors=[factor[rows] for factor in dw_factors],
+            out=out[:, rows],
+        )
+    return out
+
+
 def one_phonon_structure_factor(mode, dw_factors):
     """
     Compute the one-phonon structure factor associated with a mode.
+    See `mode_structure_factors` to compute multiple modes at once.
 
     Parameters
     ----------
-    mode : Mode
+    mode : Mode or ExtendedMode
         Mode defined at `N` q-points.
     dw_factors : iterable of ndarray, shapes (N,)
         Debye-Waller factors, at every q-point of `mode`, for each atom in the unit cell.
 
     Returns
     -------
-    oneph: ndarray, shape (N,)
+    oneph: ndarray, shape (N, 1)
         One-phonon structure factor for `mode`.
     """
-    qpoints, polarizations, hkls, crystal = (
-        mode.q_points,
-        mode.polarizations,
-        mode.hkls,
-        mode.crystal,
-    )
+    return mode_structure_factors([mode], dw_factors=dw_factors).reshape((-1, 1))
 
-    assert dw_factors[0].shape == (qpoints.shape[0],)
-    assert qpoints.shape == hkls.shape
-    assert polarizations[:, 0, :].shape == qpoints.shape
 
-    q_norm = np.linalg.norm(qpoints, axis=1, keepdims=True)
+def detector_grid():
+    """
+    Grid of wavevectors visible on the Siwick research group detector.
 
-    # We loop through atoms in order that they are visible in the PWSCF file
-    atoms = sorted(crystal, key=lambda a: a.tag)
-    accumulator = np.zeros(shape=(qpoints.shape[0], 1), dtype=complex)
-    for atm_index, atm in enumerate(atoms):
-        # Accumulator is built in pieces
-        # because all of these arrays are pretty big
-        arg = np.ones_like(
-            accumulator, dtype=complex
-        )  # because polarization are complex vectors
+    Returns
+    -------
+    qx, qy : ndarray, shape (2048, 2048)
+        Q-point mesh [1/A]
+    """
+    qx, qy, _ = detector_scattvectors(
+        keV=90,
+        camera_length=0.25,
+        shape=(2048, 2048),
+        pixel_size=14e-6,
+        center=(1024, 1024),
+    )
+    return qx, qy
 
-        arg *= np.exp(-1 * dw_factors[atm_index].reshape(-1, 1))
-        arg *= affe(atm, q_norm) / np.sqrt(atm.mass)
-        arg *= rowdot(qpoints, polarizations[:, atm_index, :])
-        accumulator += arg
 
-    return np.nan_to_num(accumulator)
+@lru_cache(maxsize=4)
+def detector_regridder(reflections, decimate=3):
+    """
+    Nearest-neighbor regridder from the q-points of modes onto the detector grid.
+    All modes share the same q-points, and therefore the same regridder.
+
+    Parameters
+    ----------
+    reflections : tuple of 3-tuple
+        Reflections used to prepare modes. See `prepare_modes`.
+    decimate : int, optional
+        Decimation number. See `prepare_modes`.
+
+    Returns
+    -------
+    regridder : dissutils.Regridder
+    """
+    modes = prepare_modes(reflections, decimate=decimate)
+    qx, qy = detector_grid()
+    return Regridder(points=modes["LA"].q_points[:, 0:2], xi=(qx, qy), method="nearest")
 
 
 def render(mode_str, reflections, smoothing_sigma=15):
     """
     Render the one-phonon structure factor map as visible on
     the Siwick research group detector, for a specific mode.
+    To render many modes, `render_modes` is much faster.
 
     Parameters
     ----------
@@ -665,81 +1263,106 @@ def render(mode_str, reflections, smoothing_sigma=15):
     f : ndarray, shape (2048, 2048)
         Mode frequencies [meV]
     """
+    images, frequencies = render_modes(
+        [mode_str], reflections=reflections, smoothing_sigma=smoothing_sigma
+    )
+    qx, qy = detector_grid()
+    return images[mode_str], qx, qy, frequencies[mode_str]
+
+
+def render_modes(mode_strs, reflections, smoothing_sigma=15, processes=1):
+    """
+    Render the one-phonon structure factor maps as visible on
+    the Siwick research group detector, for many modes at once.
+
+    Debye-Waller factors, atomic form factors, and the interpolation
+    onto the detector are computed once for all modes.
+
+    Parameters
+    ----------
+    mode_strs : iterable of str
+        Mode names, e.g. ["LA", "TA"]
+    reflections : iterable of 3-tuple
+        Reflections to use in the render.
+    smoothing_sigma : int, optional
+        Size in pixel of the smoothing gaussian kernel.
+    processes : int, optional
+        Number of processes used to smooth the maps.
+
+    Returns
+    -------
+    images : dict[str, ndarray], shapes (2048, 2048)
+        One-phonon structure factor amplitude squared for every mode.
+    frequencies : dict[str, ndarray], shapes (2048, 2048)
+        Mode frequencies [meV] for every mode.
+    """
+    mode_strs = list(mode_strs)
     reflections = tuple(reflections)  # need to be hashable for caching to work
     modes = prepare_modes(reflections)
     Ms = debye_waller_factors(modes)
 
-    mode = modes[mode_str]
-
-    F1j = np.abs(one_phonon_structure_factor(mode, dw_factors=Ms)) ** 2
-
-    # Create a grid of wavevectors that are visible on the detector
-    # Also determine what reflections are visible on the detector
-    qx, qy, _ = detector_scattvectors(
-        keV=90,
-        camera_length=0.25,
-        shape=(2048, 2048),
-        pixel_size=14e-6,
-        center=(1024, 1024),
+    oneph = mode_structure_factors(
+        [modes[mode_str] for mode_str in mode_strs], dw_factors=Ms
     )
+    F1j = np.abs(oneph) ** 2
 
-    # Interpolation sucks
-    # Here is an idea for further performance enhancements:
-    #    https://stackoverflow.com/questions/20915502/speedup-scipy-griddata-for-multiple-interpolations-between-two-irregular-grids?noredirect=1
-    #
     # Because the number of reciprocal space points is so large, we can do with only nearest interpolation
-    interpolated_oneph = griddata(
-        points=mode.q_points[:, 0:2],
-        values=F1j,
-        xi=(qx, qy),
-        method="nearest",
-        fill_value=0.0,
-    )
-
+    # The nearest-neighbor search is only done once for all modes, since they are all defined
+    # on the same q-points.
     # Frequencies are required for the oneph-majority figure
-    interpolated_f = griddata(
-        points=mode.q_points[:, 0:2],
-        values=mode.frequencies.reshape((-1, 1)),
-        xi=(qx, qy),
-        method="nearest",
-        fill_value=0.0,
-    )
+    regridder = detector_regridder(reflections)
+    images, frequencies = dict(), dict()
+    for mode_str, F in zip(mode_strs, F1j):
+        images[mode_str], frequencies[mode_str] = regridder(
+            F, modes[mode_str].frequencies
+        )
 
-    image = np.squeeze(interpolated_oneph)
-    return gaussian(image, sigma=smoothing_sigma), qx, qy, np.squeeze(interpolated_f)
+    args = [(images[mode_str], smoothing_sigma) for mode_str in mode_strs]
+    if processes > 1:
+        smoothed = worker_pool(processes).starmap(gaussian, args)
+    else:
+        smoothed = it.starmap(gaussian, args)
+    images.update(zip(mode_strs, smoothed))
 
+    return images, frequencies
 
-def calculate(mode_str, reflections):
+
+def render_all(modes, reflections, processes=1):
     """
-    Plot the one-phonon structure factor map as visible on
-    the Siwick research group detector, for a specific mode,
-    on a Matplotlib `Axes` object.
+    Render the one-phonon structure factor maps as visible on
+    the Siwick research group detector for many modes, and save
+    the results in the `ONEPH_MAPS` file (see `dissutils.load_maps`).
 
     Parameters
     ----------
-    mode_str : str
-        Mode name, e.g. "LA"
+    modes : iterable of str
+        Mode names, e.g. ["LA", "TA"]
     reflections : iterable of 3-tuple
         Reflections to use in the render.
+    processes : int, optional
+        Number of processes used to render the maps.
     """
+    reflections = tuple(reflections)
+    images, frequencies = render_modes(
+        modes, reflections=reflections, smoothing_sigma=15, processes=processes
+    )
+
+    qx, qy = detector_grid()
+    maps = {"qx": qx, "qy": qy}
+    for mode_str, image in images.items():
+        maps[f"{mode_str}_oneph"] = image
+        maps[f"{mode_str}_freq"] = frequencies[mode_str]
+
     # Calculate the locations of all reflections
     # that we  can plot as scatter.
     # Note that this is different than the hkls arrays store in the Mode class
-    modes = prepare_modes(
-        reflections
-    )  # it's ok to compute this here since results are cached.
-    cryst = modes["LA"].crystal
+    cryst = prepare_modes(reflections)["LA"].crystal
     astar, bstar, cstar = cryst.reciprocal_vectors
     bragg_peaks = np.vstack(
         [h * astar + k * bstar + l * cstar for (h, k, l) in reflections]
     )
 
-    image, qx, qy, f = render(mode_str, reflections=reflections, smoothing_sigma=15)
-    np.save(OUTPUT / f"{mode_str}_oneph.npy", image)
-    np.save(OUTPUT / f"{mode_str}_freq.npy", f)
-    np.save(OUTPUT / f"qx.npy", qx)
-    np.save(OUTPUT / f"qy.npy", qy)
-    np.save(OUTPUT / "bragg_peaks.npy", bragg_peaks)
+    save_maps(ONEPH_MAPS, maps, extras={"bragg_peaks": bragg_peaks})
 
 
 if __name__ == "__main__":
@@ -748,5 +1371,4 @@ if __name__ == "__main__":
     )
     in_plane_refls = tuple(in_plane_refls)
 
-    for mode in tqdm(IN_PLANE_MODES):
-        calculate(mode, in_plane_refls)
+    render_all(IN_PLANE_MODES, in_plane_refls, processes=NCORES)
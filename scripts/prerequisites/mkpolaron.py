@@ -3,7 +3,7 @@
 Extract the fast component of the diffuse intensity change in SnSe
 as a function of radius.
 """
-import itertools as it
+
 from pathlib import Path
 
 import numpy as np
@@ -12,6 +12,7 @@ import skued
 from crystals import Crystal
 from iris import DiffractionDataset
 
+from dissutils import time_series_selections
 from dissutils.snse import overnight4
 
 DATADIR = Path("data") / "snse"
@@ -55,37 +56,41 @@ def biexponential(time, *args, **kwargs):
 # Fast time-scale -------------------------------------------------------------
 
 radii = range(10, 50, 1)
-timeseries = dict()
 with DiffractionDataset(overnight4.path, mode="r") as dset:
     timedelays = dset.time_points
 
+    # Time-series for all radii and reflections are extracted in a single pass
+    selections = dict()
     for r in radii:
         inner_radius = r - 11
         outer_radius = r + 11
-        timeseries[r] = np.zeros_like(timedelays)
         for indices in INDICES_DIFFUSE_FAST:
-            q2 = np.linalg.norm(CRYSTAL.scattering_vector(indices)) ** 2
-
             yi, xi = overnight4.miller_to_arrindex(*indices)
-            diffuse_selection = skued.RingSelection(
+            selections[r, indices] = skued.RingSelection(
                 shape=dset.resolution,
                 center=(xi, yi),
                 inner_radius=inner_radius,
                 outer_radius=outer_radius,
             )
-            timeseries[r] += dset.time_series_selection(diffuse_selection) / q2
+    extracted = time_series_selections(dset, selections)
+
+timeseries = dict()
+for r in radii:
+    timeseries[r] = np.zeros_like(timedelays)
+    for indices in INDICES_DIFFUSE_FAST:
+        q2 = np.linalg.norm(CRYSTAL.scattering_vector(indices)) ** 2
+        timeseries[r] += extracted[r, indices] / q2
 
 # Normalize all time-series to pre-time-zero
 for k, ts in timeseries.items():
     timeseries[k] /= np.mean(ts[timedelays < 0])
 
-kx, _ = overnight4.kgrid()
-dk = kx[0, 1] - kx[0, 0]
+dk = overnight4.dk
 
 amplitudes = list()
 amplitudes_err = list()
 radii_ = list()
-for (r, ts) in timeseries.items():
+for r, ts in timeseries.items():
 
     params, pcov = opt.curve_fit(
         biexponential,
@@ -133,40 +138,14 @@ IMAGE -= eq
 IMAGE /= eq
 
 
-def diffuse_5ps(h, k, l):
-    extent = np.linspace(start=-1 / 2, stop=1 / 2, num=64, endpoint=True)
-    bz = np.zeros(shape=(len(extent), len(extent)), dtype=float)
-    err = np.zeros_like(bz)
-    xoffset = yoffset = -5  # Reflections are not perfectly aligned
-
-    for y, z in it.product(extent, repeat=2):
-        yi, xi = overnight4.miller_to_arrindex(h, k + y, l + z)
-        bz[np.argmin(np.abs(extent - y)), np.argmin(np.abs(extent - z))] = np.mean(
-            IMAGE[
-                xi - 15 + xoffset : xi + 15 + xoffset,
-                yi - 15 + yoffset : yi + 15 + yoffset,
-            ]
-        )
-        err[np.argmin(np.abs(extent - y)), np.argmin(np.abs(extent - z))] = np.std(
-            IMAGE[
-                xi - 15 + xoffset : xi + 15 + xoffset,
-                yi - 15 + yoffset : yi + 15 + yoffset,
-            ]
-        )
-
-    return bz, err
-
-
-result = np.zeros(shape=(64, 64))
-err = np.zeros_like(result)
-
-for (h, k, l) in INDICES_DIFFUSE_SLOW:
-    r, e = diffuse_5ps(h, k, l)
-    result += r
-    err += e**2
-
-result /= len(INDICES_DIFFUSE_SLOW)
-err = np.sqrt(err) / len(INDICES_DIFFUSE_SLOW)
+# Reflections are not perfectly aligned, hence the offset
+result, err = overnight4.brillouin_zone_maps(
+    IMAGE,
+    reflections=INDICES_DIFFUSE_SLOW,
+    extent=np.linspace(start=-1 / 2, stop=1 / 2, num=64, endpoint=True),
+    half_width=15,
+    offset=(-5, -5),
+)
 
 _, bstar, cstar, *_ = CRYSTAL.reciprocal.lattice_parameters
 kx, ky = np.meshgrid(